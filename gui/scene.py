@@ -10,7 +10,7 @@ import numpy as np
 from OpenGL import GL
 from PIL import Image
 
-from logic.damier import Pion
+from logic.damier import Pion, TAILLE_MAX, TAILLE_MIN
 import mp.client
 import util
 
@@ -315,7 +315,7 @@ class SceneTitre(Scene):
                     "Taille du damier", mp.client.reglages.taille_damier, step=1
                 )
 
-                if 4 <= damier_taille <= 32:
+                if TAILLE_MIN <= damier_taille <= TAILLE_MAX:
                     mp.client.reglages.taille_damier = damier_taille
 
                 _, mp.client.reglages.duree_animation = imgui.input_float(
@@ -388,6 +388,7 @@ class SceneSalons(Scene):
 
     def __init__(self):
         self.code_salon = ""
+        self.ia = False
 
     def rendre(self, t):
         if not mp.client.sock or mp.client.connexion_erreur:
@@ -401,7 +402,7 @@ class SceneSalons(Scene):
         largeur_fenetre = io.display_size.y
 
         longueur_popup = max(int(longueur_fenetre / 2), 450)
-        largeur_popup = max(largeur_fenetre // 6, 120)
+        largeur_popup = max(largeur_fenetre // 5, 150)
 
         imgui.set_next_window_size(longueur_popup, largeur_popup)
         imgui.set_next_window_position(
@@ -424,6 +425,9 @@ class SceneSalons(Scene):
         else:
             self.code_salon = code_salon
 
+        if not self.code_salon:
+            _, self.ia = imgui.checkbox("Contre l'ordinateur", self.ia)
+
         texte_confirmer = "Confirmer" if self.code_salon else "Créer"
 
         imgui.dummy(1, 10)
@@ -439,7 +443,9 @@ class SceneSalons(Scene):
         imgui.set_cursor_pos_x((longueur_popup - (2 * longueur + 20)) / 2)
 
         if imgui.button(texte_confirmer, longueur, 30 * echelle):
-            mp.client.envoyer(mp.client.paquet_salon(self.code_salon))
+            mp.client.envoyer(
+                mp.client.paquet_salon(self.code_salon, self.ia and not self.code_salon)
+            )
             self.prochaine_scene = SceneAttente()
 
         imgui.same_line(spacing=20)
@@ -1172,8 +1178,9 @@ class SceneDamier(Scene):
             pion = next((p for p in self.pions if p.position == source), None)
 
             if pion:
-                pion.type = mp.client.damier.obtenir_pion(*cible)
-                assert pion.type
+                # les étapes d'une prise en plusieurs sauts arrivent parfois
+                # ensemble : le pion est alors déjà plus loin sur le damier
+                pion.type = mp.client.damier.obtenir_pion(*cible) or pion.type
                 if pion.type.couleur() != mp.client.couleur:
                     self.__cases_deplacements = self.__trouver_cases_deplacements(
                         source, cible
@@ -1194,14 +1201,8 @@ class SceneDamier(Scene):
                 print("impossible d'effectuer le saut !")
 
         if self.pions == [] and mp.client.damier:
-            m = mp.client.damier.matrice
-            for x in range(mp.client.damier.longueur):
-                for y in range(mp.client.damier.largeur):
-                    c = m[x][y]
-                    if c:
-                        self.pions.append(
-                            SceneDamier._GLPion(self.damier, x, y, c, inverser)
-                        )
+            for (x, y), c in mp.client.damier.pions():
+                self.pions.append(SceneDamier._GLPion(self.damier, x, y, c, inverser))
 
         GL.glClear(GL.GL_COLOR_BUFFER_BIT)
 
@@ -1215,11 +1216,15 @@ class SceneDamier(Scene):
 
         if mp.client.selection:
             self.pion_curseur = mp.client.selection
-            self.__cases_possibles = [
-                c
-                for c in mp.client.damier.trouver_cases_possibles(*mp.client.selection)
-                if len(mp.client.damier.deplacer_pion(self.pion_curseur, c, False)) > 0
-            ]
+            self.__cases_possibles = list(
+                dict.fromkeys(
+                    coup.chemin[1]
+                    for coup in mp.client.damier.coups_legaux(
+                        mp.client.couleur, tuple(self.pion_curseur)
+                    )
+                    if coup.prises[0]
+                )
+            )
             self.overlay.set_cases(self.__cases_possibles, self.__cases_deplacements)
 
         if inverser:
@@ -0,0 +1,124 @@
+# archive de parties : fichier binaire en ajout seul
+#
+# Le fichier commence par ENTETE, puis chaque partie est un enregistrement :
+#
+#   <I   taille du reste de l'enregistrement en octets
+#   <BBBH  longueur, largeur, résultat, nombre de coups
+#   pour chaque coup :
+#     <B  nombre de cases du chemin
+#     <H  indice x * largeur + y de chaque case
+#
+# Les prises ne sont pas stockées : elles se déduisent du chemin en rejouant
+# la partie. Un chemin sans case est une passe : le camp au trait était bloqué.
+# Le résultat vaut 0 pour une nulle, sinon la valeur de Pion du gagnant.
+
+from collections.abc import Iterable, Iterator
+import struct
+from typing import NamedTuple
+
+from .damier import Coup, Damier, Pion
+
+ENTETE = b"PYDAMES\x01"
+
+_TAILLE = struct.Struct("<I")
+_PARTIE = struct.Struct("<BBBH")
+
+# chemin d'un camp bloqué qui passe son tour
+PASSE: tuple[tuple[int, int], ...] = ()
+
+
+class Partie(NamedTuple):
+    longueur: int
+    largeur: int
+    # chemins des coups joués, les noirs commencent ; le trait change à
+    # chaque chemin, PASSE compris
+    coups: tuple[tuple[tuple[int, int], ...], ...]
+    gagnant: Pion | None
+
+    def rejouer(self) -> Iterator[Damier]:
+        # position après chaque coup, en partant de Damier.installer() ;
+        # une passe redonne la même position
+        damier = Damier(self.longueur, self.largeur)
+        damier.installer()
+        for chemin in self.coups:
+            for source, cible in zip(chemin, chemin[1:]):
+                damier.deplacer_pion(source, cible)
+            yield damier
+
+
+def encoder(
+    longueur: int,
+    largeur: int,
+    coups: Iterable[Coup | tuple[tuple[int, int], ...]],
+    gagnant: Pion | None,
+) -> bytes:
+    corps = bytearray()
+    nombre = 0
+
+    for coup in coups:
+        chemin = coup.chemin if isinstance(coup, Coup) else coup
+        corps.append(len(chemin))
+        corps += struct.pack(f"<{len(chemin)}H", *(x * largeur + y for x, y in chemin))
+        nombre += 1
+
+    entete = _PARTIE.pack(longueur, largeur, gagnant.value if gagnant else 0, nombre)
+    return _TAILLE.pack(len(entete) + len(corps)) + entete + corps
+
+
+def decoder(donnees: bytes | memoryview) -> Partie:
+    longueur, largeur, gagnant, nombre = _PARTIE.unpack_from(donnees)
+    position = _PARTIE.size
+    coups = []
+
+    for _ in range(nombre):
+        n = donnees[position]
+        indices = struct.unpack_from(f"<{n}H", donnees, position + 1)
+        coups.append(tuple(divmod(i, largeur) for i in indices))
+        position += 1 + 2 * n
+
+    return Partie(longueur, largeur, tuple(coups), Pion(gagnant) if gagnant else None)
+
+
+class Ecrivain:
+    # les parties arrivent déjà encodées : l'écriture se limite à des write()
+    # dans un tampon, le travail d'encodage reste dans les processus de jeu
+    def __init__(self, chemin: str, tampon: int = 1 << 20):
+        self.__fichier = open(chemin, "ab", buffering=tampon)
+        if self.__fichier.tell() == 0:
+            self.__fichier.write(ENTETE)
+        self.parties = 0
+
+    def ajouter(self, enregistrement: bytes):
+        self.__fichier.write(enregistrement)
+        self.parties += 1
+
+    def fermer(self):
+        self.__fichier.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_):
+        self.fermer()
+
+
+def lire(chemin: str, debut: int = 0) -> Iterator[Partie]:
+    # lecture enregistrement par enregistrement : l'archive peut dépasser la mémoire ;
+    # les debut premières parties sont sautées sans être décodées
+    with open(chemin, "rb") as fichier:
+        entete = fichier.read(len(ENTETE))
+        if not entete:
+            return
+        if entete != ENTETE:
+            raise ValueError(f"{chemin} n'est pas une archive de parties")
+
+        while len(prefixe := fichier.read(_TAILLE.size)) == _TAILLE.size:
+            (taille,) = _TAILLE.unpack(prefixe)
+            if debut:
+                fichier.seek(taille, 1)
+                debut -= 1
+                continue
+            donnees = fichier.read(taille)
+            if len(donnees) < taille:
+                break  # dernier enregistrement incomplet, écriture interrompue
+            yield decoder(donnees)
@@ -0,0 +1,175 @@
+# parties de l'ordinateur contre lui-même, jouées en parallèle
+#
+#   python -m logic.autojeu -n 1000 -t 10 parties.pda
+#   python -m logic.autojeu --noirs moteur --blancs gourmand -j 4 parties.pda
+#
+# Chaque processus joue un lot de parties et renvoie les enregistrements déjà
+# encodés ; le processus principal ne fait que les ajouter à l'archive. Au plus
+# deux lots par processus sont en cours : la mémoire ne dépend pas du nombre
+# de parties.
+
+import argparse
+from collections.abc import Callable
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+import os
+import random
+import time
+
+from . import archive
+from .damier import Coup, Damier, Pion
+from .ia import Recherche, TableTransposition, evaluer
+
+# budget de réflexion par coup de la politique "moteur", en secondes
+BUDGET_MOTEUR = 0.05
+
+
+def _aleatoire(damier: Damier, trait: Pion, coups: list[Coup], aleatoire) -> Coup:
+    return aleatoire.choice(coups)
+
+
+def _gourmand(damier: Damier, trait: Pion, coups: list[Coup], aleatoire) -> Coup:
+    # meilleure évaluation après un seul coup, au hasard parmi les ex aequo
+    scores = []
+    for coup in coups:
+        damier.jouer(coup)
+        scores.append(-evaluer(damier, _adversaire(trait)))
+        damier.annuler()
+
+    meilleur = max(scores)
+    return aleatoire.choice([c for c, s in zip(coups, scores) if s == meilleur])
+
+
+def _moteur(damier: Damier, trait: Pion, coups: list[Coup], aleatoire) -> Coup:
+    resultat = Recherche(damier, TableTransposition(1 << 16)).chercher(
+        trait, BUDGET_MOTEUR
+    )
+    return resultat.coup or aleatoire.choice(coups)
+
+
+POLITIQUES: dict[str, Callable] = {
+    "aleatoire": _aleatoire,
+    "gourmand": _gourmand,
+    "moteur": _moteur,
+}
+
+
+def _adversaire(trait: Pion) -> Pion:
+    return Pion.BLANC if trait == Pion.NOIR else Pion.NOIR
+
+
+def jouer_partie(
+    taille: int, noirs: str, blancs: str, graine: int, max_coups: int = 300
+) -> tuple[list[Coup | tuple], Pion | None]:
+    aleatoire = random.Random(graine)
+    politiques = {Pion.NOIR: POLITIQUES[noirs], Pion.BLANC: POLITIQUES[blancs]}
+    damier = Damier(taille, taille)
+    damier.installer()
+
+    joues = []
+    trait = Pion.NOIR
+    while len(joues) < max_coups:
+        if gagnant := damier.gagnant():
+            return joues, gagnant
+
+        coups = damier.coups_legaux(trait)
+        if coups:
+            coup = politiques[trait](damier, trait, coups, aleatoire)
+            damier.jouer(coup)
+            joues.append(coup)
+        elif damier.peut_jouer(_adversaire(trait)):
+            # un camp bloqué passe son tour, comme dans la recherche de logic.ia
+            joues.append(archive.PASSE)
+        else:
+            break
+        trait = _adversaire(trait)
+
+    # partie trop longue ou personne ne peut jouer : nulle
+    return joues, damier.gagnant()
+
+
+def jouer_lot(
+    taille: int, noirs: str, blancs: str, graines: range, max_coups: int = 300
+) -> list[bytes]:
+    # point d'entrée des processus : renvoie des enregistrements d'archive
+    return [
+        archive.encoder(
+            taille, taille, *jouer_partie(taille, noirs, blancs, g, max_coups)
+        )
+        for g in graines
+    ]
+
+
+def generer(
+    chemin: str,
+    parties: int,
+    taille: int = 10,
+    noirs: str = "aleatoire",
+    blancs: str = "aleatoire",
+    processus: int | None = None,
+    lot: int = 32,
+    max_coups: int = 300,
+    graine: int = 0,
+) -> tuple[int, float]:
+    processus = processus or os.cpu_count() or 1
+    debut = time.perf_counter()
+
+    with ProcessPoolExecutor(processus) as executeur, archive.Ecrivain(
+        chemin
+    ) as ecrivain:
+        lots = iter(range(0, parties, lot))
+        taches = set()
+
+        while True:
+            for i in lots:
+                taches.add(
+                    executeur.submit(
+                        jouer_lot,
+                        taille,
+                        noirs,
+                        blancs,
+                        range(graine + i, graine + min(i + lot, parties)),
+                        max_coups,
+                    )
+                )
+                if len(taches) >= 2 * processus:
+                    break
+            if not taches:
+                break
+
+            finies, taches = wait(taches, return_when=FIRST_COMPLETED)
+            for tache in finies:
+                for enregistrement in tache.result():
+                    ecrivain.ajouter(enregistrement)
+
+    return ecrivain.parties, time.perf_counter() - debut
+
+
+if __name__ == "__main__":
+    parseur = argparse.ArgumentParser(
+        prog="logic.autojeu", description="Génère des parties de l'ordinateur"
+    )
+    parseur.add_argument("archive", help="fichier d'archive, complété s'il existe")
+    parseur.add_argument("-n", "--parties", type=int, default=1000)
+    parseur.add_argument("-t", "--taille", type=int, default=10)
+    parseur.add_argument("--noirs", choices=POLITIQUES, default="aleatoire")
+    parseur.add_argument("--blancs", choices=POLITIQUES, default="aleatoire")
+    parseur.add_argument("-j", "--processus", type=int, help="nombre de processus")
+    parseur.add_argument("--max-coups", type=int, default=300)
+    parseur.add_argument("--graine", type=int, default=0)
+    args = parseur.parse_args()
+
+    processus = args.processus or os.cpu_count() or 1
+    parties, duree = generer(
+        args.archive,
+        args.parties,
+        args.taille,
+        args.noirs,
+        args.blancs,
+        processus,
+        max_coups=args.max_coups,
+        graine=args.graine,
+    )
+    print(
+        f"{parties} parties en {duree:.2f} s : {parties / duree:.1f} parties/s, "
+        f"{parties / duree / processus:.1f} parties/s par processus"
+    )
@@ -0,0 +1,257 @@
+# mesures de performance du damier
+#
+#   python -m logic.benchmark                     listes contre bits
+#   python -m logic.benchmark mesurer -o resultats.json
+#   python -m logic.benchmark verifier            échoue si une opération a ralenti
+#   python -m logic.benchmark reference           remplace la référence
+#
+# La référence (benchmark.json, à côté de ce fichier) contient le temps de
+# chaque opération de Damier sur chaque position. Elle dépend de la machine :
+# la régénérer avant de comparer ailleurs que là où elle a été mesurée.
+
+import argparse
+import json
+import os
+import random
+import sys
+import timeit
+
+from .damier import Damier, Pion
+from .damier_liste import DamierListe
+
+REFERENCE = os.path.join(os.path.dirname(__file__), "benchmark.json")
+TAILLES = (8, 10, 16, 32)
+SEUIL = 0.25
+
+
+def position_milieu(classe, taille: int, coups: int = 20, graine: int = 0):
+    aleatoire = random.Random(graine)
+    damier = classe(taille, taille)
+    damier.installer()
+
+    for _ in range(coups):
+        deplacements = [
+            ((x, y), c)
+            for x in range(taille)
+            for y in range(taille)
+            for c in damier.trouver_cases_possibles(x, y)
+        ]
+        if not deplacements:
+            break
+        damier.deplacer_pion(*aleatoire.choice(deplacements))
+
+    return damier
+
+
+def position_finale(
+    classe, taille: int, dames: int = 3, pions: int = 2, graine: int = 0
+):
+    # finale chargée en dames : quelques dames et pions de chaque camp
+    # sur des cases foncées tirées au hasard
+    aleatoire = random.Random(graine)
+    damier = classe(taille, taille)
+    cases = [(x, y) for x in range(taille) for y in range(1, taille - 1) if (x + y) % 2]
+
+    pieces = [Pion.DAME_NOIR, Pion.DAME_BLANC] * dames + [Pion.NOIR, Pion.BLANC] * pions
+    for case, pion in zip(aleatoire.sample(cases, len(pieces)), pieces):
+        damier.ajouter_pion(*case, pion)
+
+    return damier
+
+
+def _positions(taille: int) -> dict:
+    return {
+        "ouverture": position_milieu(Damier, taille, 0),
+        "milieu": position_milieu(Damier, taille, 30),
+        "finale": position_finale(Damier, taille),
+    }
+
+
+def _operations(damier) -> dict:
+    pions = [
+        (x, y)
+        for x in range(damier.longueur)
+        for y in range(damier.largeur)
+        if damier.obtenir_pion(x, y)
+    ]
+    source = next(p for p in pions if damier.trouver_cases_possibles(*p))
+    cible = damier.trouver_cases_possibles(*source)[0]
+
+    def trouver():
+        for p in pions:
+            damier.trouver_cases_possibles(*p)
+
+    return {
+        "validation": lambda: cible in damier.trouver_cases_possibles(*source),
+        "trouver_cases_possibles": trouver,
+        "deplacer_pion": lambda: damier.deplacer_pion(source, cible, False),
+        "gagnant": damier.gagnant,
+        "est_bloque": damier.est_bloque,
+        "fin_de_partie": lambda: damier.gagnant() or damier.est_bloque(),
+    }
+
+
+def mesurer(fonction, repetitions: int = 3) -> float:
+    n, _ = timeit.Timer(fonction).autorange()
+    return min(timeit.Timer(fonction).repeat(repetitions, n)) / n
+
+
+def _suite(damier) -> dict:
+    # toutes les opérations de Damier, sans modifier la position mesurée
+    pions = [
+        (x, y)
+        for x in range(damier.longueur)
+        for y in range(damier.largeur)
+        if damier.obtenir_pion(x, y)
+    ]
+    source, cible = next(
+        (p, c)
+        for p in pions
+        for c in damier.trouver_cases_possibles(*p)
+        if not damier.deplacer_pion(p, c, False) and 0 < c[1] < damier.largeur - 1
+    )
+    coup = damier.coups_legaux(damier.obtenir_pion(*source).couleur())[0]
+    matrice = damier.matrice
+    vide = Damier(damier.longueur, damier.largeur)
+
+    def trouver():
+        for p in pions:
+            damier.trouver_cases_possibles(*p)
+
+    def aller_retour():
+        # un déplacement sans prise, puis le retour du pion
+        damier.deplacer_pion(source, cible)
+        damier.deplacer_pion(cible, source)
+
+    def installer():
+        vide.vider()
+        vide.installer()
+
+    # juste après un coup, est_bloque() recalcule la mobilité des cases touchées ;
+    # jouer_annuler donne la part du coup lui-même dans ces mesures
+    def jouer_annuler():
+        damier.jouer(coup)
+        damier.annuler()
+
+    def jouer_est_bloque():
+        damier.jouer(coup)
+        damier.est_bloque()
+        damier.annuler()
+
+    def jouer_gagnant():
+        damier.jouer(coup)
+        damier.gagnant()
+        damier.annuler()
+
+    return {
+        "installer": installer,
+        "trouver_cases_possibles": trouver,
+        "deplacer_pion": lambda: damier.deplacer_pion(source, cible, False),
+        "deplacer_pion_effectuer": aller_retour,
+        "gagnant": damier.gagnant,
+        "est_bloque": damier.est_bloque,
+        "jouer_annuler": jouer_annuler,
+        "jouer_est_bloque": jouer_est_bloque,
+        "jouer_gagnant": jouer_gagnant,
+        "matrice": lambda: damier.matrice,
+        "from_matrice": lambda: Damier.from_matrice(matrice),
+    }
+
+
+def mesurer_tout(tailles=TAILLES, afficher: bool = True) -> dict[str, float]:
+    # secondes par appel, indexées par « position taille opération »
+    resultats = {}
+    for taille in tailles:
+        for nom, damier in _positions(taille).items():
+            for operation, fonction in _suite(damier).items():
+                cle = f"{nom} {taille} {operation}"
+                resultats[cle] = mesurer(fonction, 5)
+                if afficher:
+                    print(f"{cle:<40}{resultats[cle] * 1e6:>12.2f}µs")
+    return resultats
+
+
+def regressions(
+    resultats: dict[str, float], reference: dict[str, float], seuil: float = SEUIL
+) -> dict[str, float]:
+    # rapport temps / référence des opérations plus lentes que (1 + seuil) fois
+    # la référence ; les opérations absentes de la référence sont ignorées
+    return {
+        cle: temps / reference[cle]
+        for cle, temps in resultats.items()
+        if cle in reference and temps > reference[cle] * (1 + seuil)
+    }
+
+
+def verifier(chemin: str = REFERENCE, seuil: float = SEUIL, tailles=TAILLES) -> bool:
+    with open(chemin, encoding="utf-8") as fichier:
+        reference = json.load(fichier)
+
+    resultats = mesurer_tout(tailles, afficher=False)
+    lentes = regressions(resultats, reference, seuil)
+    for cle, temps in resultats.items():
+        if cle in reference:
+            rapport = temps / reference[cle]
+            marque = "  RÉGRESSION" if cle in lentes else ""
+            print(f"{cle:<40}{temps * 1e6:>12.2f}µs{rapport:>8.2f}x{marque}")
+
+    print(f"{len(lentes)} régressions au-delà de {seuil:.0%}")
+    return not lentes
+
+
+def comparer(tailles=(8, 10, 16)):
+    print(f"{'position':<14}{'opération':<26}{'listes':>12}{'bits':>12}{'gain':>8}")
+
+    for taille in tailles:
+        for nom, coups in (("ouverture", 0), ("milieu", 30)):
+            liste = _operations(position_milieu(DamierListe, taille, coups))
+            bits = _operations(position_milieu(Damier, taille, coups))
+
+            for operation in liste:
+                t_liste = mesurer(liste[operation])
+                t_bits = mesurer(bits[operation])
+                print(
+                    f"{f'{nom} {taille}':<14}{operation:<26}"
+                    f"{t_liste * 1e6:>10.2f}µs{t_bits * 1e6:>10.2f}µs"
+                    f"{t_liste / t_bits:>7.1f}x"
+                )
+
+
+def _ecrire(chemin: str, resultats: dict[str, float]):
+    with open(chemin, "w", encoding="utf-8") as fichier:
+        json.dump(resultats, fichier, indent=2)
+        fichier.write("\n")
+
+
+if __name__ == "__main__":
+    parseur = argparse.ArgumentParser(
+        prog="logic.benchmark", description="Mesures de performance du damier"
+    )
+    commandes = parseur.add_subparsers(dest="commande")
+
+    commande = commandes.add_parser("mesurer", help="mesurer toutes les opérations")
+    commande.add_argument("-o", "--sortie", help="fichier JSON des résultats")
+    commande.add_argument("-t", "--tailles", type=int, nargs="+", default=TAILLES)
+
+    commande = commandes.add_parser("verifier", help="comparer à la référence")
+    commande.add_argument("-r", "--reference", default=REFERENCE)
+    commande.add_argument(
+        "-s", "--seuil", type=float, default=SEUIL, help="ralentissement toléré"
+    )
+    commande.add_argument("-t", "--tailles", type=int, nargs="+", default=TAILLES)
+
+    commande = commandes.add_parser("reference", help="remplacer la référence")
+    commande.add_argument("-r", "--reference", default=REFERENCE)
+
+    args = parseur.parse_args()
+
+    if args.commande == "mesurer":
+        resultats = mesurer_tout(args.tailles)
+        if args.sortie:
+            _ecrire(args.sortie, resultats)
+    elif args.commande == "verifier":
+        sys.exit(0 if verifier(args.reference, args.seuil, args.tailles) else 1)
+    elif args.commande == "reference":
+        _ecrire(args.reference, mesurer_tout())
+    else:
+        comparer()
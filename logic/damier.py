@@ -1,4 +1,9 @@
+from collections.abc import Iterator
 from enum import Enum
+from functools import cache
+import random
+import struct
+from typing import NamedTuple
 
 
 class Pion(Enum):
@@ -8,42 +13,159 @@ class Pion(Enum):
     DAME_BLANC = 4
 
     def couleur(self):
-        match self:
-            case Pion.NOIR:
-                return Pion.NOIR
-            case Pion.BLANC:
-                return Pion.BLANC
-            case Pion.DAME_NOIR:
-                return Pion.NOIR
-            case Pion.DAME_BLANC:
-                return Pion.BLANC
-            case _:
-                raise NotImplementedError("pion inconnu")
+        return _PIONS[COULEUR[self.value]]
 
     def dame(self):
-        match self:
-            case Pion.NOIR:
-                return Pion.DAME_NOIR
-            case Pion.BLANC:
-                return Pion.DAME_BLANC
-            case Pion.DAME_NOIR:
-                return Pion.DAME_NOIR
-            case Pion.DAME_BLANC:
-                return Pion.DAME_BLANC
-            case _:
-                raise NotImplementedError("pion inconnu")
+        return _PIONS[DAME[self.value]]
 
     def est_dame(self):
-        return self.dame() == self
+        return bool(EST_DAME[self.value])
+
+
+# codage compact des pions : 0 pour une case vide, Pion.value sinon
+VIDE = 0
+_PIONS = (None, Pion.NOIR, Pion.BLANC, Pion.DAME_NOIR, Pion.DAME_BLANC)
+# tables indexées par le code d'un pion
+COULEUR = bytes((VIDE, 1, 2, 1, 2))
+DAME = bytes((VIDE, 3, 4, 3, 4))
+EST_DAME = bytes((0, 0, 0, 1, 1))
+
+
+def encoder(pion: Pion | None) -> int:
+    return pion.value if pion else VIDE
+
+
+def decoder(code: int) -> Pion | None:
+    return _PIONS[code]
+
+
+_DIRECTIONS = ((-1, -1), (-1, 1), (1, -1), (1, 1))
+
+# tailles de damier proposées par le client et acceptées par le serveur ; les
+# tables de _geometrie grandissent comme le cube de la taille, d'où la borne
+TAILLE_MIN, TAILLE_MAX = 4, 32
+
+_TAILLE = struct.Struct("<BB")
+
+
+class Coup(NamedTuple):
+    # cases visitées par le pion, de la source à la destination finale
+    chemin: tuple[tuple[int, int], ...]
+    # cases prises à chaque étape du chemin
+    prises: tuple[tuple[tuple[int, int], ...], ...]
+
+    @property
+    def source(self) -> tuple[int, int]:
+        return self.chemin[0]
+
+    @property
+    def cible(self) -> tuple[int, int]:
+        return self.chemin[-1]
+
+    @property
+    def etape(self) -> tuple[tuple[int, int], tuple[int, int]]:
+        return self.chemin[0], self.chemin[1]
+
+    def sauts(self) -> list[tuple[int, int]]:
+        return [case for prises in self.prises for case in prises]
+
+
+def indexer_coups(
+    coups: list[Coup],
+) -> dict[tuple[tuple[int, int], tuple[int, int]], list[Coup]]:
+    index = {}
+    for coup in coups:
+        index.setdefault(coup.etape, []).append(coup)
+    return index
+
+
+class _Geometrie(NamedTuple):
+    coordonnees: tuple[tuple[int, int], ...]
+    # pour chaque case et chaque direction de _DIRECTIONS, les cases jusqu'au bord
+    rayons: tuple[tuple[tuple[int, ...], ...], ...]
+    voisins: tuple[tuple[int, ...], ...]  # -1 hors du damier
+    sauts: tuple[tuple[int, ...], ...]  # case d'arrivée d'un saut, -1 hors du damier
+    # masque des cases des deux diagonales qui traversent chaque case
+    diagonales: tuple[int, ...]
+
+
+@cache
+def _geometrie(longueur: int, largeur: int) -> _Geometrie:
+    # une case (x, y) correspond au bit x * largeur + y ;
+    # les tables sont partagées par tous les damiers de même taille
+    coordonnees, rayons, voisins, sauts, diagonales = [], [], [], [], []
+
+    for x in range(longueur):
+        for y in range(largeur):
+            rayons_case = []
+            for dx, dy in _DIRECTIONS:
+                rayon = []
+                nx, ny = x + dx, y + dy
+                while 0 <= nx < longueur and 0 <= ny < largeur:
+                    rayon.append(nx * largeur + ny)
+                    nx, ny = nx + dx, ny + dy
+                rayons_case.append(tuple(rayon))
+
+            coordonnees.append((x, y))
+            rayons.append(tuple(rayons_case))
+            voisins.append(tuple(r[0] if r else -1 for r in rayons_case))
+            sauts.append(tuple(r[1] if len(r) > 1 else -1 for r in rayons_case))
+            diagonales.append(
+                sum(1 << n for r in rayons_case for n in r) | 1 << (x * largeur + y)
+            )
+
+    return _Geometrie(
+        tuple(coordonnees),
+        tuple(rayons),
+        tuple(voisins),
+        tuple(sauts),
+        tuple(diagonales),
+    )
+
+
+def _direction(dx: int, dy: int) -> int:
+    # indice de la direction (dx, dy) dans _DIRECTIONS
+    return (2 if dx > 0 else 0) + (1 if dy > 0 else 0)
+
+
+@cache
+def _zobrist(longueur: int, largeur: int) -> tuple[tuple[tuple[int, ...], ...], int]:
+    # graine fixe par taille : le hachage d'une position est le même d'une exécution à l'autre
+    aleatoire = random.Random(f"pydames zobrist {longueur}x{largeur}")
+    tables = tuple(
+        tuple(aleatoire.getrandbits(64) for _ in range(longueur * largeur))
+        for _ in Pion
+    )
+    return tables, aleatoire.getrandbits(64)
 
 
 class Damier:
+    __slots__ = (
+        "__longueur",
+        "__largeur",
+        "__zobrist",
+        "__zobrist_trait",
+        "__geometrie",
+        "__cases",
+        "__noirs",
+        "__blancs",
+        "__dames",
+        "__hachage",
+        "__historique",
+        "__compteurs",
+        "__mobiles",
+        "__a_verifier",
+    )
+
     def __init__(self, longueur: int, largeur: int):
+        assert 0 < longueur <= TAILLE_MAX and 0 < largeur <= TAILLE_MAX
         self.__longueur, self.__largeur = longueur, largeur
+        self.__zobrist, self.__zobrist_trait = _zobrist(longueur, largeur)
+        self.__geometrie = _geometrie(longueur, largeur)
         self.vider()
 
     def __str__(self):
-        matrice_transposee = list(map(list, zip(*self.__matrice)))
+        matrice_transposee = list(map(list, zip(*self.matrice)))
         s = ""
         for i in range(len(matrice_transposee)):
             s += str([p.value if p else 0 for p in matrice_transposee[i]]) + "\n"
@@ -60,13 +182,50 @@ class Damier:
             assert len(matrice[x]) == largeur
             for y in range(largeur):
                 valeur = matrice[x][y]
-                if isinstance(valeur, int):
-                    valeur = Pion(valeur)
-                assert not valeur or isinstance(valeur, Pion)
-                damier.__matrice[x][y] = valeur
+                if isinstance(valeur, Pion):
+                    valeur = valeur.value
+                assert not valeur or 0 < valeur < len(_PIONS)
+                if valeur:
+                    damier.__poser(x * largeur + y, valeur)
 
         return damier
 
+    def from_bytes(donnees: bytes) -> "Damier":
+        # format de to_bytes
+        longueur, largeur = _TAILLE.unpack_from(donnees)
+        n = longueur * largeur
+        octets = (n + 7) // 8
+        assert len(donnees) == _TAILLE.size + 3 * octets
+
+        noirs, blancs, dames = (
+            int.from_bytes(donnees[debut : debut + octets], "little")
+            for debut in range(_TAILLE.size, len(donnees), octets)
+        )
+        assert not noirs & blancs and not dames & ~(noirs | blancs)
+        assert (noirs | blancs) < 1 << n
+
+        damier = Damier(longueur, largeur)
+        for masque, pion in (
+            (noirs & ~dames, Pion.NOIR),
+            (blancs & ~dames, Pion.BLANC),
+            (noirs & dames, Pion.DAME_NOIR),
+            (blancs & dames, Pion.DAME_BLANC),
+        ):
+            while masque:
+                damier.__poser((masque & -masque).bit_length() - 1, pion.value)
+                masque &= masque - 1
+
+        return damier
+
+    def to_bytes(self) -> bytes:
+        # <BB longueur et largeur, puis les masques des noirs, des blancs et
+        # des dames en petit-boutiste, sur (longueur * largeur + 7) // 8 octets chacun
+        octets = (self.__longueur * self.__largeur + 7) // 8
+        return _TAILLE.pack(self.__longueur, self.__largeur) + b"".join(
+            masque.to_bytes(octets, "little")
+            for masque in (self.__noirs, self.__blancs, self.__dames)
+        )
+
     @property
     def longueur(self) -> int:
         return self.__longueur
@@ -75,36 +234,125 @@ class Damier:
     def largeur(self) -> int:
         return self.__largeur
 
+    @property
+    def noirs(self) -> int:
+        return self.__noirs
+
+    @property
+    def blancs(self) -> int:
+        return self.__blancs
+
+    @property
+    def dames(self) -> int:
+        return self.__dames
+
+    @property
+    def hachage(self) -> int:
+        return self.__hachage
+
+    def cle(self, trait: Pion) -> int:
+        # hachage de la position avec le camp qui doit jouer
+        if trait.couleur() == Pion.BLANC:
+            return self.__hachage ^ self.__zobrist_trait
+        return self.__hachage
+
+    @property
+    def cases(self) -> bytes:
+        # code de chaque case, case (x, y) à l'indice x * largeur + y
+        return bytes(self.__cases)
+
     @property
     def matrice(self) -> list[list[Pion | None]]:
-        return [rang.copy() for rang in self.__matrice]  # copie de liste 2D
+        cases = [_PIONS[c] for c in self.__cases]
+        return [
+            cases[x * self.__largeur : (x + 1) * self.__largeur]
+            for x in range(self.__longueur)
+        ]
+
+    def pions(
+        self, couleur: Pion | None = None
+    ) -> Iterator[tuple[tuple[int, int], Pion]]:
+        # pièces d'un camp, ou de tous, en ne parcourant que les bits occupés :
+        # le coût suit le nombre de pièces et non la taille du damier ;
+        # le damier ne doit pas être modifié pendant le parcours
+        if couleur is None:
+            masque = self.__noirs | self.__blancs
+        elif COULEUR[couleur.value] == Pion.NOIR.value:
+            masque = self.__noirs
+        else:
+            masque = self.__blancs
+
+        coordonnees = self.__geometrie.coordonnees
+        while masque:
+            i = (masque & -masque).bit_length() - 1
+            yield coordonnees[i], _PIONS[self.__cases[i]]
+            masque &= masque - 1
 
     def vider(self):
-        self.__matrice = [
-            [None for _ in range(self.__largeur)] for _ in range(self.__longueur)
-        ]
+        self.__cases = bytearray(self.__longueur * self.__largeur)
+        self.__noirs = self.__blancs = self.__dames = 0
+        self.__hachage = 0
+        self.__historique = []
+        # nombre de pions de chaque type, indexé par le code du pion
+        self.__compteurs = [0, 0, 0, 0, 0]
+        # pions qui peuvent jouer, et cases dont la mobilité doit être recalculée
+        self.__mobiles = self.__a_verifier = 0
 
     def installer(self):
         n = self.__largeur // 2 - 1
 
         for y in range(0, n):
             for x in range((y + 1) % 2, self.__longueur, 2):
-                self.__matrice[x][y] = Pion.NOIR
+                self.__poser(x * self.__largeur + y, Pion.NOIR.value)
         for y in range(self.__largeur - n, self.__largeur):
             for x in range((y + 1) % 2, self.__longueur, 2):
-                self.__matrice[x][y] = Pion.BLANC
+                self.__poser(x * self.__largeur + y, Pion.BLANC.value)
+
+    def __poser(self, i: int, code: int):
+        # code : valeur de Pion, les tables du module sont indexées par ce code
+        self.__enlever(i)
+        self.__cases[i] = code
+        self.__hachage ^= self.__zobrist[code - 1][i]
+        self.__compteurs[code] += 1
+        self.__a_verifier |= self.__geometrie.diagonales[i]
+
+        bit = 1 << i
+        if COULEUR[code] == 1:
+            self.__noirs |= bit
+        else:
+            self.__blancs |= bit
+        if EST_DAME[code]:
+            self.__dames |= bit
+
+    def __enlever(self, i: int):
+        code = self.__cases[i]
+        if not code:
+            return
+
+        self.__cases[i] = VIDE
+        self.__hachage ^= self.__zobrist[code - 1][i]
+        self.__compteurs[code] -= 1
+        self.__a_verifier |= self.__geometrie.diagonales[i]
+
+        masque = ~(1 << i)
+        self.__noirs &= masque
+        self.__blancs &= masque
+        self.__dames &= masque
 
     def obtenir_pion(self, x: int, y: int) -> Pion | None:
         assert 0 <= x < self.__longueur and 0 <= y < self.__largeur
-        return self.__matrice[x][y]
+        return _PIONS[self.__cases[x * self.__largeur + y]]
 
     def ajouter_pion(self, x: int, y: int, couleur: Pion):
         assert 0 <= x < self.__longueur and 0 <= y < self.__largeur
-        self.__matrice[x][y] = couleur
+        if couleur:
+            self.__poser(x * self.__largeur + y, couleur.value)
+        else:
+            self.__enlever(x * self.__largeur + y)
 
     def enlever_pion(self, x: int, y: int):
         assert 0 <= x < self.__longueur and 0 <= y < self.__largeur
-        self.__matrice[x][y] = None
+        self.__enlever(x * self.__largeur + y)
 
     def deplacer_pion(
         self,
@@ -116,38 +364,33 @@ class Damier:
 
         x_src, y_src = position_source
         x_dst, y_dst = position_cible
+        largeur = self.__largeur
 
-        assert 0 <= x_src < self.__longueur and 0 <= y_src < self.__largeur
-        assert self.__matrice[x_src][y_src]
-        assert 0 <= x_dst < self.__longueur and 0 <= y_dst < self.__largeur
+        assert 0 <= x_src < self.__longueur and 0 <= y_src < largeur
+        assert 0 <= x_dst < self.__longueur and 0 <= y_dst < largeur
+
+        code = self.__cases[x_src * largeur + y_src]
+        assert code
 
         d = x_dst - x_src
         assert abs(d) == abs(y_dst - y_src)
 
-        pion = self.__matrice[x_src][y_src]
-
-        for dx in range(0, d, 1 if d > 0 else -1):
-            dy = dx if (y_dst - y_src) > 0 else -dx
-            if d < 0:
-                dy = -dy
-            n = (x_src + dx, y_src + dy)
-
-            if 0 <= n[1] < self.__largeur:
-                p = self.__matrice[n[0]][n[1]]
-                if p:
-                    if n[0] != x_src and n[1] != y_src:
-                        cases_sautees.append(n)
-                    if effectuer:
-                        self.__matrice[n[0]][n[1]] = None
+        occupees = self.__noirs | self.__blancs
+        coordonnees = self.__geometrie.coordonnees
+        rayon = self.__geometrie.rayons[x_src * largeur + y_src][
+            _direction(d, y_dst - y_src)
+        ]
 
-        modification_dame = (pion == Pion.NOIR and y_dst == self.__largeur - 1) or (
-            pion == Pion.BLANC and y_dst == 0
-        )
+        for i in rayon[: abs(d) - 1]:
+            if (occupees >> i) & 1:
+                cases_sautees.append(coordonnees[i])
+                if effectuer:
+                    self.__enlever(i)
 
         if effectuer:
-            if modification_dame:
-                pion = pion.dame()
-            self.__matrice[x_dst][y_dst] = pion
+            self.__enlever(x_src * largeur + y_src)
+
+            self.__poser(x_dst * largeur + y_dst, self.__promotion(code, y_dst))
 
         return cases_sautees
 
@@ -155,75 +398,257 @@ class Damier:
         assert 0 <= x < self.__longueur and 0 <= y < self.__largeur
 
         cases = []
-        pion = self.__matrice[x][y]
-        if not pion:
-            return cases
+        i = x * self.__largeur + y
 
-        directions = [(-1, -1), (-1, 1), (1, -1), (1, 1)]
-        max_distance = max(self.__longueur, self.__largeur) if pion.est_dame() else 2
-        avance = 1 if pion.couleur() == Pion.NOIR else -1
+        if (self.__noirs >> i) & 1:
+            amis, ennemis, avance = self.__noirs, self.__blancs, 1
+        elif (self.__blancs >> i) & 1:
+            amis, ennemis, avance = self.__blancs, self.__noirs, -1
+        else:
+            return cases
 
-        for d in directions:
-            if not pion.est_dame() and d[1] != avance:
+        occupees = amis | ennemis
+        coordonnees = self.__geometrie.coordonnees
+        est_dame = (self.__dames >> i) & 1
+
+        for (_, dy), rayon in zip(_DIRECTIONS, self.__geometrie.rayons[i]):
+            if not est_dame:
+                if dy != avance or not rayon:
+                    continue
+                # un pion ne regarde que la case voisine et la case de saut
+                n = rayon[0]
+                if (ennemis >> n) & 1:
+                    if len(rayon) > 1 and not (occupees >> rayon[1]) & 1:
+                        cases.append(coordonnees[rayon[1]])
+                elif not (amis >> n) & 1:
+                    cases.append(coordonnees[n])
                 continue
 
-            for dist in range(1, max_distance):
-                n = (x + d[0] * dist, y + d[1] * dist)
-
-                if not (0 <= n[0] < self.__longueur and 0 <= n[1] < self.__largeur):
+            for k, n in enumerate(rayon):
+                if (ennemis >> n) & 1:
+                    if k + 1 < len(rayon) and not (occupees >> rayon[k + 1]) & 1:
+                        cases.append(coordonnees[rayon[k + 1]])
+                elif (amis >> n) & 1:
                     break
-
-                case = self.__matrice[n[0]][n[1]]
-                if case:
-                    if pion.couleur() != case.couleur():
-                        saut = (n[0] + d[0], n[1] + d[1])
-                        if (
-                            0 <= saut[0] < self.__longueur
-                            and 0 <= saut[1] < self.__largeur
-                            and not self.__matrice[saut[0]][saut[1]]
-                        ):
-                            cases.append(saut)
-                    else:
-                        break
                 else:
-                    if pion.est_dame() or dist == 1:
-                        cases.append(n)
+                    cases.append(coordonnees[n])
 
         return cases
 
-    def gagnant(self) -> Pion | None:
-        pions_noirs = any(
-            self.__matrice[x][y] and self.__matrice[x][y].couleur() == Pion.NOIR
-            for x in range(self.__longueur)
-            for y in range(self.__largeur)
-        )
+    def __deplacements(self, i: int) -> list[tuple[tuple[int, int], tuple]]:
+        # cases atteignables depuis i avec les cases sautées pour y arriver,
+        # dans l'ordre de trouver_cases_possibles et sans doublon
+        deplacements = []
+
+        if (self.__noirs >> i) & 1:
+            amis, ennemis, avance = self.__noirs, self.__blancs, 1
+        else:
+            amis, ennemis, avance = self.__blancs, self.__noirs, -1
+
+        occupees = amis | ennemis
+        coordonnees = self.__geometrie.coordonnees
+
+        if not (self.__dames >> i) & 1:
+            voisins, sauts = self.__geometrie.voisins[i], self.__geometrie.sauts[i]
+            for d in (_direction(-1, avance), _direction(1, avance)):
+                n = voisins[d]
+                if n < 0:
+                    continue
+                if not (occupees >> n) & 1:
+                    deplacements.append((coordonnees[n], ()))
+                elif (ennemis >> n) & 1 and sauts[d] >= 0:
+                    if not (occupees >> sauts[d]) & 1:
+                        deplacements.append((coordonnees[sauts[d]], (coordonnees[n],)))
+            return deplacements
+
+        # une dame atteint chaque case vide avant le premier pion ami
+        # et prend tous les pions adverses traversés
+        for rayon in self.__geometrie.rayons[i]:
+            prises = ()
+            for n in rayon:
+                if (amis >> n) & 1:
+                    break
+                if (ennemis >> n) & 1:
+                    prises += (coordonnees[n],)
+                else:
+                    deplacements.append((coordonnees[n], prises))
 
-        pions_blancs = any(
-            self.__matrice[x][y] and self.__matrice[x][y].couleur() == Pion.BLANC
-            for x in range(self.__longueur)
-            for y in range(self.__largeur)
+        return deplacements
+
+    def __promotion(self, code: int, y: int) -> int:
+        # les noirs sont promus sur la dernière rangée, les blancs sur la première
+        if y == (self.__largeur - 1 if COULEUR[code] == 1 else 0):
+            return DAME[code]
+        return code
+
+    def __appliquer(
+        self,
+        source: tuple[int, int],
+        cible: tuple[int, int],
+        sauts,
+        chemin=(),
+    ) -> tuple:
+        # déplace le pion en retirant les cases sautées et renvoie de quoi annuler
+        largeur = self.__largeur
+        i_src, i_dst = source[0] * largeur + source[1], cible[0] * largeur + cible[1]
+        cases = self.__cases
+        pion = cases[i_src]
+        assert pion
+        prises = [(x * largeur + y, cases[x * largeur + y]) for x, y in sauts]
+
+        promu = pion
+        for _, y in chemin or (cible,):
+            promu = self.__promotion(promu, y)
+
+        for i, _ in prises:
+            self.__enlever(i)
+        self.__enlever(i_src)
+        self.__poser(i_dst, promu)
+
+        return i_src, pion, i_dst, prises
+
+    def __restaurer(self, modification: tuple):
+        i_src, pion, i_dst, prises = modification
+
+        self.__enlever(i_dst)
+        self.__poser(i_src, pion)
+        for i, p in prises:
+            self.__poser(i, p)
+
+    def jouer(self, coup: Coup):
+        self.__historique.append(
+            self.__appliquer(coup.source, coup.cible, coup.sauts(), coup.chemin[1:])
         )
 
-        if not pions_noirs:
+    def annuler(self):
+        self.__restaurer(self.__historique.pop())
+
+    def __chaines(self, position: tuple[int, int]) -> list[list]:
+        # suites de sauts possibles pour le pion qui vient de sauter en position
+        chaines = []
+
+        for cible, sauts in self.__deplacements(
+            position[0] * self.__largeur + position[1]
+        ):
+            if not sauts:
+                continue
+
+            modification = self.__appliquer(position, cible, sauts)
+            suites = self.__chaines(cible)
+            self.__restaurer(modification)
+
+            if suites:
+                for chemin, prises in suites:
+                    chaines.append(([position, *chemin], [sauts, *prises]))
+            else:
+                chaines.append(([position, cible], [sauts]))
+
+        return chaines
+
+    def coups_legaux(
+        self, couleur: Pion, depuis: tuple[int, int] | None = None
+    ) -> list[Coup]:
+        # les sauts sont prolongés tant que le pion peut encore sauter ;
+        # le serveur laisse tout de même le joueur s'arrêter en cours de chaîne
+        coups = []
+        largeur = self.__largeur
+        trait = COULEUR[couleur.value]
+
+        if depuis:
+            positions = [depuis]
+        else:
+            positions = [case for case, _ in self.pions(couleur)]
+
+        for source in positions:
+            # une case vide a la couleur VIDE et n'est jamais retenue
+            if COULEUR[self.__cases[source[0] * largeur + source[1]]] != trait:
+                continue
+
+            for cible, sauts in self.__deplacements(source[0] * largeur + source[1]):
+                if not sauts:
+                    coups.append(Coup((source, cible), ((),)))
+                    continue
+
+                modification = self.__appliquer(source, cible, sauts)
+                suites = self.__chaines(cible)
+                self.__restaurer(modification)
+
+                if suites:
+                    for chemin, prises in suites:
+                        coups.append(
+                            Coup((source, *chemin), (sauts, *map(tuple, prises)))
+                        )
+                else:
+                    coups.append(Coup((source, cible), (sauts,)))
+
+        return coups
+
+    def compter(self, pion: Pion) -> int:
+        return self.__compteurs[pion.value]
+
+    def gagnant(self) -> Pion | None:
+        compteurs = self.__compteurs
+
+        if not compteurs[Pion.NOIR.value] + compteurs[Pion.DAME_NOIR.value]:
             return Pion.BLANC
-        if not pions_blancs:
+        if not compteurs[Pion.BLANC.value] + compteurs[Pion.DAME_BLANC.value]:
             return Pion.NOIR
 
         return None
 
-    def est_bloque(self) -> bool:
-        noir_peut_jouer = any(
-            self.trouver_cases_possibles(x, y)
-            for x in range(self.__longueur)
-            for y in range(self.__largeur)
-            if self.__matrice[x][y] and self.__matrice[x][y].couleur() == Pion.NOIR
-        )
+    def __est_mobile(self, i: int) -> bool:
+        if (self.__noirs >> i) & 1:
+            amis, ennemis, avance = self.__noirs, self.__blancs, 1
+        else:
+            amis, ennemis, avance = self.__blancs, self.__noirs, -1
+        occupees = amis | ennemis
+
+        if (self.__dames >> i) & 1:
+            # une dame peut jouer dès qu'une case vide est atteignable
+            # en ne traversant que des pions adverses
+            for rayon in self.__geometrie.rayons[i]:
+                for n in rayon:
+                    if not (occupees >> n) & 1:
+                        return True
+                    if (amis >> n) & 1:
+                        break
+            return False
 
-        blanc_peut_jouer = any(
-            self.trouver_cases_possibles(x, y)
-            for x in range(self.__longueur)
-            for y in range(self.__largeur)
-            if self.__matrice[x][y] and self.__matrice[x][y].couleur() == Pion.BLANC
+        voisins, sauts = self.__geometrie.voisins[i], self.__geometrie.sauts[i]
+        for d in (_direction(-1, avance), _direction(1, avance)):
+            n = voisins[d]
+            if n < 0:
+                continue
+            if not (occupees >> n) & 1:
+                return True
+            if (ennemis >> n) & 1 and sauts[d] >= 0 and not (occupees >> sauts[d]) & 1:
+                return True
+
+        return False
+
+    def __actualiser_mobiles(self):
+        # seules les pièces sur les diagonales des cases modifiées sont recalculées
+        a_verifier = self.__a_verifier & (self.__noirs | self.__blancs)
+        self.__mobiles &= ~self.__a_verifier
+        self.__a_verifier = 0
+
+        while a_verifier:
+            bit = a_verifier & -a_verifier
+            if self.__est_mobile(bit.bit_length() - 1):
+                self.__mobiles |= bit
+            a_verifier ^= bit
+
+    def mobiles(self, couleur: Pion) -> int:
+        if self.__a_verifier:
+            self.__actualiser_mobiles()
+        return self.__mobiles & (
+            self.__noirs if couleur.couleur() == Pion.NOIR else self.__blancs
         )
 
-        return not blanc_peut_jouer and not noir_peut_jouer
+    def peut_jouer(self, couleur: Pion) -> bool:
+        return bool(self.mobiles(couleur))
+
+    def est_bloque(self) -> bool:
+        if self.__a_verifier:
+            self.__actualiser_mobiles()
+        return not self.__mobiles
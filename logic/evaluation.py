@@ -0,0 +1,158 @@
+# évaluation vectorisée de lots de positions avec NumPy
+#
+# Un lot est un tableau (N, longueur, largeur) d'entiers int8 qui contient la
+# valeur de Pion de chaque case (0 pour une case vide), comme Damier.matrice.
+
+from collections.abc import Iterable
+
+import numpy as np
+
+from .damier import Damier, Pion
+from .ia import POIDS_AVANCE, POIDS_DAME, POIDS_PION
+
+POIDS_MOBILITE = 2
+POIDS_MENACE = 30
+
+_HORS = -1  # valeur des cases en dehors du damier
+
+
+def vers_tableau(damiers: Iterable[Damier]) -> np.ndarray:
+    damiers = list(damiers)
+    assert damiers
+
+    longueur, largeur = damiers[0].longueur, damiers[0].largeur
+    tableau = np.empty((len(damiers), longueur * largeur), dtype=np.int8)
+    for i, damier in enumerate(damiers):
+        assert (damier.longueur, damier.largeur) == (longueur, largeur)
+        # Damier.cases contient déjà le code de chaque case, dans l'ordre x, y
+        tableau[i] = np.frombuffer(damier.cases, np.int8)
+
+    return tableau.reshape(-1, longueur, largeur)
+
+
+def depuis_bitboards(
+    noirs: np.ndarray,
+    blancs: np.ndarray,
+    dames: np.ndarray,
+    longueur: int,
+    largeur: int,
+) -> np.ndarray:
+    # masques empaquetés en petit-boutiste, (N, octets) uint8, bit x * largeur + y
+    n = longueur * largeur
+
+    def deballer(masque):
+        bits = np.unpackbits(masque, axis=-1, count=n, bitorder="little")
+        return bits.reshape(-1, longueur, largeur).astype(np.int8)
+
+    noirs, blancs, dames = deballer(noirs), deballer(blancs), deballer(dames)
+    # NOIR = 1, BLANC = 2, DAME_NOIR = 3, DAME_BLANC = 4
+    return noirs * Pion.NOIR.value + blancs * Pion.BLANC.value + dames * 2
+
+
+def _decaler(tableau: np.ndarray, dx: int, dy: int) -> np.ndarray:
+    # resultat[:, x, y] = tableau[:, x + dx, y + dy], _HORS en dehors du damier
+    _, longueur, largeur = tableau.shape
+    resultat = np.full_like(tableau, _HORS)
+
+    xs = slice(max(0, -dx), longueur - max(0, dx))
+    ys = slice(max(0, -dy), largeur - max(0, dy))
+    xd = slice(max(0, dx), longueur + min(0, dx))
+    yd = slice(max(0, dy), largeur + min(0, dy))
+
+    resultat[:, xs, ys] = tableau[:, xd, yd]
+    return resultat
+
+
+def _compter(masque: np.ndarray) -> np.ndarray:
+    return masque.sum(axis=(1, 2), dtype=np.int32)
+
+
+def caracteristiques(tableau: np.ndarray) -> dict[str, np.ndarray]:
+    assert tableau.ndim == 3
+
+    _, _, largeur = tableau.shape
+    vide = tableau == 0
+    pions = {
+        Pion.NOIR: tableau == Pion.NOIR.value,
+        Pion.BLANC: tableau == Pion.BLANC.value,
+    }
+    dames = {
+        Pion.NOIR: tableau == Pion.DAME_NOIR.value,
+        Pion.BLANC: tableau == Pion.DAME_BLANC.value,
+    }
+    camps = {c: pions[c] | dames[c] for c in pions}
+
+    resultat = {
+        "pions_noirs": _compter(pions[Pion.NOIR]),
+        "pions_blancs": _compter(pions[Pion.BLANC]),
+        "dames_noires": _compter(dames[Pion.NOIR]),
+        "dames_blanches": _compter(dames[Pion.BLANC]),
+    }
+
+    # mobilité : déplacements simples et prises des pions,
+    # cases voisines libres des dames
+    voisins = {(dx, dy): _decaler(tableau, dx, dy) for dx in (-1, 1) for dy in (-1, 1)}
+    voisins_vides = {d: v == 0 for d, v in voisins.items()}
+    sauts_vides = {
+        d: _decaler(vide.astype(np.int8), 2 * d[0], 2 * d[1]) == 1 for d in voisins
+    }
+
+    for couleur, avance, nom in ((Pion.NOIR, 1, "noirs"), (Pion.BLANC, -1, "blancs")):
+        adversaire = Pion.BLANC if couleur == Pion.NOIR else Pion.NOIR
+        mobilite = np.zeros(len(tableau), dtype=np.int32)
+
+        for dx in (-1, 1):
+            d = (dx, avance)
+            ennemi = (voisins[d] == adversaire.value) | (
+                voisins[d] == adversaire.dame().value
+            )
+            mobilite += _compter(pions[couleur] & voisins_vides[d])
+            mobilite += _compter(pions[couleur] & ennemi & sauts_vides[d])
+
+        for d in voisins:
+            mobilite += _compter(dames[couleur] & voisins_vides[d])
+
+        resultat[f"mobilite_{nom}"] = mobilite
+
+    # avance des pions : nombre de rangées parcourues
+    y = np.arange(largeur, dtype=np.int32)
+    resultat["avance_noirs"] = (pions[Pion.NOIR] * y).sum(axis=(1, 2), dtype=np.int32)
+    resultat["avance_blancs"] = (pions[Pion.BLANC] * (largeur - 1 - y)).sum(
+        axis=(1, 2), dtype=np.int32
+    )
+
+    # menace de promotion : pion sur l'avant-dernière rangée avec une case libre devant
+    menace_noirs = pions[Pion.NOIR] & (voisins_vides[(-1, 1)] | voisins_vides[(1, 1)])
+    menace_blancs = pions[Pion.BLANC] & (
+        voisins_vides[(-1, -1)] | voisins_vides[(1, -1)]
+    )
+    resultat["menaces_noirs"] = menace_noirs[:, :, largeur - 2].sum(
+        axis=1, dtype=np.int32
+    )
+    resultat["menaces_blancs"] = menace_blancs[:, :, 1].sum(axis=1, dtype=np.int32)
+
+    resultat["pieces_noires"] = _compter(camps[Pion.NOIR])
+    resultat["pieces_blanches"] = _compter(camps[Pion.BLANC])
+
+    return resultat
+
+
+def evaluer_lot(
+    tableau: np.ndarray, trait: Pion | np.ndarray = Pion.NOIR
+) -> tuple[np.ndarray, dict[str, np.ndarray]]:
+    # score du point de vue du camp qui a le trait ; les termes de matériel
+    # et d'avance sont ceux de logic.ia.evaluer
+    c = caracteristiques(tableau)
+
+    score = POIDS_PION * (c["pions_noirs"] - c["pions_blancs"])
+    score += POIDS_DAME * (c["dames_noires"] - c["dames_blanches"])
+    score += POIDS_AVANCE * (c["avance_noirs"] - c["avance_blancs"])
+    score += POIDS_MOBILITE * (c["mobilite_noirs"] - c["mobilite_blancs"])
+    score += POIDS_MENACE * (c["menaces_noirs"] - c["menaces_blancs"])
+
+    if isinstance(trait, Pion):
+        signe = 1 if trait.couleur() == Pion.NOIR else -1
+    else:
+        signe = np.where(np.asarray(trait) == Pion.BLANC.value, -1, 1)
+
+    return score * signe, c
@@ -0,0 +1,324 @@
+# tables de finales calculées par analyse rétrograde
+#
+#   python -m logic.finales -t 8 -p 3          génère les tables 8x8 jusqu'à 3 pièces
+#   python -m logic.finales -t 6 -p 4 -d tables
+#
+# Une table couvre une taille de damier et une signature : le nombre de pions
+# noirs, de pions blancs, de dames noires et de dames blanches, dans l'ordre des
+# valeurs de Pion. Chaque position a un indice parfait : le rang combinatoire
+# des cases de chaque type de pièce parmi les cases foncées, puis le trait.
+#
+# Une position est stockée sur un octet :
+#   0           nulle, ou position impossible
+#   1 à 127     le camp qui a le trait gagne en n demi-coups
+#   128 + n     le camp qui a le trait perd en n demi-coups
+#
+# Les règles sont celles de logic.ia : un camp bloqué passe son tour, la partie
+# est nulle si personne ne peut jouer.
+
+import argparse
+from collections import defaultdict
+from functools import cache
+from itertools import combinations, product
+from math import comb, prod
+import mmap
+import os
+import struct
+import time
+from typing import NamedTuple
+
+from .damier import Damier, Pion
+
+ENTETE = b"PYDAMESF"
+_DIMENSIONS = struct.Struct("<BBBBBB")
+
+NULLE, GAIN, PERTE = 0, 1, -1
+_DISTANCE_MAX = 127
+
+_TYPES = (Pion.NOIR, Pion.BLANC, Pion.DAME_NOIR, Pion.DAME_BLANC)
+
+
+class Valeur(NamedTuple):
+    # GAIN, PERTE ou NULLE pour le camp qui a le trait
+    resultat: int
+    # demi-coups avant la fin de la partie, 0 pour une nulle
+    distance: int
+
+
+@cache
+def _cases_foncees(
+    longueur: int, largeur: int
+) -> tuple[tuple[int, ...], tuple[int, ...]]:
+    # les pièces restent sur les cases x + y impair (voir Damier.installer)
+    cases = tuple(
+        x * largeur + y for x in range(longueur) for y in range(largeur) if (x + y) % 2
+    )
+    rangs = [-1] * (longueur * largeur)
+    for rang, i in enumerate(cases):
+        rangs[i] = rang
+    return cases, tuple(rangs)
+
+
+def _rang(cases) -> int:
+    # rang colexicographique d'une combinaison croissante
+    return sum(comb(c, j) for j, c in enumerate(cases, 1))
+
+
+class _Dimensions:
+    def __init__(self, longueur: int, largeur: int, signature: tuple[int, ...]):
+        n = len(_cases_foncees(longueur, largeur)[0])
+        self.signature = signature
+        self.groupes = tuple(comb(n, k) for k in signature)
+        self.taille = prod(self.groupes) * 2
+
+    def indice(self, groupes, trait: Pion) -> int:
+        indice = 0
+        for taille, cases in zip(self.groupes, groupes):
+            indice = indice * taille + _rang(cases)
+        return indice * 2 + (trait.couleur() == Pion.BLANC)
+
+
+def _signature(damier: Damier) -> tuple[int, ...]:
+    return tuple(damier.compter(pion) for pion in _TYPES)
+
+
+def _groupes(damier: Damier) -> tuple[list[int], ...]:
+    # rangs croissants des cases foncées occupées par chaque type de pièce
+    _, rangs = _cases_foncees(damier.longueur, damier.largeur)
+    noirs, blancs, dames = damier.noirs, damier.blancs, damier.dames
+    groupes = ([], [], [], [])
+
+    for k, masque in enumerate(
+        (noirs & ~dames, blancs & ~dames, noirs & dames, blancs & dames)
+    ):
+        while masque:
+            i = (masque & -masque).bit_length() - 1
+            groupes[k].append(rangs[i])
+            masque &= masque - 1
+
+    return groupes
+
+
+def _nom(longueur: int, largeur: int, signature: tuple[int, ...]) -> str:
+    return f"{longueur}x{largeur}-{'-'.join(map(str, signature))}.fin"
+
+
+def _decoder(octet: int) -> Valeur:
+    if octet == 0:
+        return Valeur(NULLE, 0)
+    if octet < 128:
+        return Valeur(GAIN, octet)
+    return Valeur(PERTE, octet - 128)
+
+
+class Tables:
+    # les fichiers sont projetés en mémoire à la première consultation de
+    # chaque signature : une table jamais consultée ne coûte rien
+    def __init__(self, dossier: str, longueur: int, largeur: int):
+        self.dossier = dossier
+        self.longueur, self.largeur = longueur, largeur
+        self.__ouvertes = {}
+
+        prefixe = f"{longueur}x{largeur}-"
+        self.pieces_max = 0
+        if os.path.isdir(dossier):
+            for nom in os.listdir(dossier):
+                if nom.startswith(prefixe) and nom.endswith(".fin"):
+                    signature = nom[len(prefixe) : -len(".fin")].split("-")
+                    self.pieces_max = max(self.pieces_max, sum(map(int, signature)))
+
+    def __table(self, signature: tuple[int, ...]):
+        if signature in self.__ouvertes:
+            return self.__ouvertes[signature]
+
+        table = None
+        chemin = os.path.join(
+            self.dossier, _nom(self.longueur, self.largeur, signature)
+        )
+        if os.path.exists(chemin):
+            with open(chemin, "rb") as fichier:
+                donnees = mmap.mmap(fichier.fileno(), 0, access=mmap.ACCESS_READ)
+            debut = len(ENTETE) + _DIMENSIONS.size
+            if donnees[: len(ENTETE)] != ENTETE or _DIMENSIONS.unpack_from(
+                donnees, len(ENTETE)
+            ) != (self.longueur, self.largeur, *signature):
+                raise ValueError(f"{chemin} n'est pas une table de finales valide")
+            table = (
+                _Dimensions(self.longueur, self.largeur, signature),
+                memoryview(donnees)[debut:],
+            )
+
+        self.__ouvertes[signature] = table
+        return table
+
+    def valeur(self, signature: tuple[int, ...], groupes, trait: Pion) -> Valeur | None:
+        if not (signature[0] + signature[2]):
+            return Valeur(PERTE if trait == Pion.NOIR else GAIN, 0)
+        if not (signature[1] + signature[3]):
+            return Valeur(PERTE if trait == Pion.BLANC else GAIN, 0)
+
+        if not (table := self.__table(signature)):
+            return None
+        dimensions, valeurs = table
+        return _decoder(valeurs[dimensions.indice(groupes, trait)])
+
+    def sonder(self, damier: Damier, trait: Pion) -> Valeur | None:
+        if (damier.noirs | damier.blancs).bit_count() > self.pieces_max:
+            return None
+        return self.valeur(_signature(damier), _groupes(damier), trait.couleur())
+
+    def fermer(self):
+        for table in self.__ouvertes.values():
+            if table:
+                table[1].release()
+        self.__ouvertes.clear()
+
+
+def _adversaire(trait: Pion) -> Pion:
+    return Pion.BLANC if trait == Pion.NOIR else Pion.NOIR
+
+
+def _positions(longueur: int, largeur: int, signature: tuple[int, ...]):
+    # toutes les placements possibles : cases distinctes, pas de pion
+    # sur sa rangée de promotion
+    cases, _ = _cases_foncees(longueur, largeur)
+    interdites = (
+        {r for r, i in enumerate(cases) if i % largeur == largeur - 1},
+        {r for r, i in enumerate(cases) if i % largeur == 0},
+        set(),
+        set(),
+    )
+
+    for groupes in product(*(combinations(range(len(cases)), k) for k in signature)):
+        occupees = [r for g in groupes for r in g]
+        if len(set(occupees)) != len(occupees):
+            continue
+        if any(interdites[k].intersection(g) for k, g in enumerate(groupes)):
+            continue
+        yield groupes
+
+
+def resoudre(
+    longueur: int, largeur: int, signature: tuple[int, ...], tables: Tables
+) -> bytearray:
+    # les successeurs qui changent de signature (prise, promotion) sont lus
+    # dans les tables déjà écrites ; les autres forment un graphe que l'on
+    # résout en partant des positions dont la valeur est connue
+    dimensions = _Dimensions(longueur, largeur, signature)
+    cases, _ = _cases_foncees(longueur, largeur)
+    damier = Damier(longueur, largeur)
+
+    valeurs = bytearray(dimensions.taille)
+    restants = {}
+    predecesseurs = defaultdict(list)
+    # seaux[d] : (position, le successeur est perdant) pour un successeur fini en d
+    seaux = defaultdict(list)
+
+    for groupes in _positions(longueur, largeur, signature):
+        damier.vider()
+        for pion, g in zip(_TYPES, groupes):
+            for r in g:
+                damier.ajouter_pion(*divmod(cases[r], largeur), pion)
+
+        for trait in (Pion.NOIR, Pion.BLANC):
+            p = dimensions.indice(groupes, trait)
+            adversaire = _adversaire(trait)
+            coups = damier.coups_legaux(trait)
+            restants[p] = max(len(coups), 1)
+
+            if not coups:
+                if damier.peut_jouer(adversaire):
+                    predecesseurs[dimensions.indice(groupes, adversaire)].append(p)
+                else:
+                    restants[p] = -1  # personne ne peut jouer : nulle
+                continue
+
+            for coup in coups:
+                damier.jouer(coup)
+                suivante = _signature(damier)
+                if suivante == signature:
+                    predecesseurs[
+                        dimensions.indice(_groupes(damier), adversaire)
+                    ].append(p)
+                else:
+                    valeur = tables.valeur(suivante, _groupes(damier), adversaire)
+                    if valeur is None:
+                        raise FileNotFoundError(
+                            f"table manquante : {_nom(longueur, largeur, suivante)}"
+                        )
+                    if valeur.resultat != NULLE:
+                        seaux[valeur.distance].append((p, valeur.resultat == PERTE))
+                damier.annuler()
+
+    distance = 0
+    while distance <= max(seaux, default=-1):
+        for p, perdant in seaux.pop(distance, ()):
+            if valeurs[p] or restants[p] < 0:
+                continue
+
+            if not perdant:
+                restants[p] -= 1
+                if restants[p]:
+                    continue
+
+            if distance + 1 > _DISTANCE_MAX:
+                raise ValueError("distance trop grande pour la table")
+            valeurs[p] = distance + 1 if perdant else 128 + distance + 1
+            for q in predecesseurs.get(p, ()):
+                seaux[distance + 1].append((q, not perdant))
+
+        distance += 1
+
+    return valeurs
+
+
+def signatures(pieces_max: int):
+    # dans l'ordre de résolution : moins de pièces, puis moins de pions,
+    # puisqu'une prise retire une pièce et qu'une promotion retire un pion
+    resultat = [
+        s
+        for s in product(range(pieces_max), repeat=4)
+        if 2 <= sum(s) <= pieces_max and s[0] + s[2] and s[1] + s[3]
+    ]
+    return sorted(resultat, key=lambda s: (sum(s), s[0] + s[1], s))
+
+
+def generer(dossier: str, longueur: int, largeur: int, pieces_max: int):
+    os.makedirs(dossier, exist_ok=True)
+
+    for signature in signatures(pieces_max):
+        chemin = os.path.join(dossier, _nom(longueur, largeur, signature))
+        if os.path.exists(chemin):
+            continue
+
+        debut = time.perf_counter()
+        # une nouvelle instance voit les tables écrites aux tours précédents
+        tables = Tables(dossier, longueur, largeur)
+        valeurs = resoudre(longueur, largeur, signature, tables)
+        tables.fermer()
+
+        with open(chemin + ".tmp", "wb") as fichier:
+            fichier.write(ENTETE)
+            fichier.write(_DIMENSIONS.pack(longueur, largeur, *signature))
+            fichier.write(valeurs)
+        os.replace(chemin + ".tmp", chemin)
+
+        gains = sum(1 for v in valeurs if 0 < v < 128)
+        pertes = sum(1 for v in valeurs if v >= 128)
+        print(
+            f"{_nom(longueur, largeur, signature)} : {len(valeurs)} positions, "
+            f"{gains} gains, {pertes} pertes, "
+            f"{time.perf_counter() - debut:.1f} s"
+        )
+
+
+if __name__ == "__main__":
+    parseur = argparse.ArgumentParser(
+        prog="logic.finales", description="Génère les tables de finales"
+    )
+    parseur.add_argument("-t", "--taille", type=int, default=8)
+    parseur.add_argument("-p", "--pieces", type=int, default=3)
+    parseur.add_argument("-d", "--dossier", default="finales")
+    args = parseur.parse_args()
+
+    generer(args.dossier, args.taille, args.taille, args.pieces)
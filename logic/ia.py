@@ -0,0 +1,312 @@
+# adversaire ordinateur : recherche alpha-bêta par approfondissement itératif
+
+from functools import cache
+import os
+import random
+import time
+from typing import NamedTuple
+
+from .damier import Coup, Damier, Pion
+from .finales import GAIN, PERTE, Tables
+from .ouvertures import Livre
+
+MAT = 1_000_000
+POIDS_PION = 100
+POIDS_DAME = 300
+POIDS_AVANCE = 4
+
+EXACT, MINIMUM, MAXIMUM = 0, 1, 2
+
+
+class Resultat(NamedTuple):
+    coup: Coup | None
+    score: int
+    profondeur: int
+    noeuds: int
+    duree: float
+
+    @property
+    def noeuds_par_seconde(self) -> float:
+        return self.noeuds / self.duree if self.duree > 0 else 0.0
+
+
+class TableTransposition:
+    def __init__(self, taille: int = 1 << 20):
+        self.__taille = taille
+        self.__entrees = {}
+
+    def lire(self, cle: int) -> tuple[int, int, int, int] | None:
+        return self.__entrees.get(cle)
+
+    def ecrire(
+        self, cle: int, profondeur: int, score: int, drapeau: int, meilleur: int
+    ):
+        entree = self.__entrees.get(cle)
+        if entree and entree[0] > profondeur:
+            return
+
+        if len(self.__entrees) >= self.__taille and not entree:
+            self.__entrees.clear()
+        self.__entrees[cle] = (profondeur, score, drapeau, meilleur)
+
+
+class _TempsEcoule(Exception):
+    pass
+
+
+@cache
+def _rangees(longueur: int, largeur: int) -> tuple[int, ...]:
+    # masque des cases de chaque rangée y
+    return tuple(
+        sum(1 << (x * largeur + y) for x in range(longueur)) for y in range(largeur)
+    )
+
+
+def evaluer(damier: Damier, trait: Pion) -> int:
+    noirs, blancs, dames = damier.noirs, damier.blancs, damier.dames
+    pions_noirs, pions_blancs = noirs & ~dames, blancs & ~dames
+
+    score = POIDS_PION * (pions_noirs.bit_count() - pions_blancs.bit_count())
+    score += POIDS_DAME * ((noirs & dames).bit_count() - (blancs & dames).bit_count())
+
+    # les noirs avancent vers y croissant, les blancs vers y décroissant
+    derniere = damier.largeur - 1
+    for y, rangee in enumerate(_rangees(damier.longueur, damier.largeur)):
+        score += POIDS_AVANCE * (
+            y * (pions_noirs & rangee).bit_count()
+            - (derniere - y) * (pions_blancs & rangee).bit_count()
+        )
+
+    return score if trait.couleur() == Pion.NOIR else -score
+
+
+def _adversaire(trait: Pion) -> Pion:
+    return Pion.BLANC if trait.couleur() == Pion.NOIR else Pion.NOIR
+
+
+class Recherche:
+    def __init__(
+        self,
+        damier: Damier,
+        table: TableTransposition | None = None,
+        finales: Tables | None = None,
+    ):
+        self.damier = damier
+        self.table = table if table is not None else TableTransposition()
+        self.finales = finales
+        self.historique = {}
+        self.noeuds = 0
+        self.__fin = None
+        self.__racine = None
+
+    def __ordonner(self, coups: list[Coup], meilleur: int | None) -> list[Coup]:
+        def priorite(i):
+            coup = coups[i]
+            return (
+                i == meilleur,
+                len(coup.sauts()),
+                self.historique.get(coup.etape, 0),
+            )
+
+        return sorted(range(len(coups)), key=priorite, reverse=True)
+
+    def __repos(self, trait: Pion, alpha: int, beta: int, ply: int) -> int:
+        # prolonge la recherche tant que des prises sont possibles
+        self.noeuds += 1
+        damier = self.damier
+
+        if not (damier.noirs if trait.couleur() == Pion.NOIR else damier.blancs):
+            return -MAT + ply
+
+        score = evaluer(damier, trait)
+        if score >= beta:
+            return score
+        alpha = max(alpha, score)
+
+        prises = [c for c in damier.coups_legaux(trait) if c.prises[0]]
+        prises.sort(key=lambda c: len(c.sauts()), reverse=True)
+
+        for coup in prises:
+            damier.jouer(coup)
+            score = -self.__repos(_adversaire(trait), -beta, -alpha, ply + 1)
+            damier.annuler()
+
+            if score >= beta:
+                return score
+            alpha = max(alpha, score)
+
+        return alpha
+
+    def __negamax(
+        self, trait: Pion, profondeur: int, alpha: int, beta: int, ply: int
+    ) -> int:
+        self.noeuds += 1
+        if not self.noeuds & 1023 and time.perf_counter() > self.__fin:
+            raise _TempsEcoule()
+
+        damier = self.damier
+        if not (damier.noirs if trait.couleur() == Pion.NOIR else damier.blancs):
+            return -MAT + ply
+
+        # à la racine, la recherche doit tout de même choisir un coup
+        if ply and self.finales and (valeur := self.finales.sonder(damier, trait)):
+            if valeur.resultat == GAIN:
+                return MAT - ply - valeur.distance
+            if valeur.resultat == PERTE:
+                return -MAT + ply + valeur.distance
+            return 0
+
+        if profondeur <= 0:
+            return self.__repos(trait, alpha, beta, ply)
+
+        cle = damier.cle(trait)
+        alpha_initial = alpha
+        meilleur = None
+
+        if entree := self.table.lire(cle):
+            profondeur_entree, score, drapeau, meilleur = entree
+            # pas de coupure à la racine : chercher() doit connaître le meilleur coup
+            if ply and profondeur_entree >= profondeur:
+                score = _score_depuis_table(score, ply)
+                if drapeau == EXACT:
+                    return score
+                if drapeau == MINIMUM:
+                    alpha = max(alpha, score)
+                elif drapeau == MAXIMUM:
+                    beta = min(beta, score)
+                if alpha >= beta:
+                    return score
+
+        coups = damier.coups_legaux(trait)
+
+        if not coups:
+            # le joueur bloqué passe son tour, partie nulle si personne ne peut jouer
+            if not damier.peut_jouer(_adversaire(trait)):
+                return 0
+            return -self.__negamax(
+                _adversaire(trait), profondeur - 1, -beta, -alpha, ply + 1
+            )
+
+        meilleur_score = -MAT - 1
+        for i in self.__ordonner(coups, meilleur):
+            coup = coups[i]
+
+            damier.jouer(coup)
+            try:
+                score = -self.__negamax(
+                    _adversaire(trait), profondeur - 1, -beta, -alpha, ply + 1
+                )
+            finally:
+                damier.annuler()
+
+            if score > meilleur_score:
+                meilleur_score, meilleur = score, i
+            if score > alpha:
+                alpha = score
+            if alpha >= beta:
+                if not coup.prises[0]:
+                    self.historique[coup.etape] = (
+                        self.historique.get(coup.etape, 0) + profondeur * profondeur
+                    )
+                break
+
+        if not ply:
+            self.__racine = meilleur
+
+        if meilleur_score <= alpha_initial:
+            drapeau = MAXIMUM
+        elif meilleur_score >= beta:
+            drapeau = MINIMUM
+        else:
+            drapeau = EXACT
+        self.table.ecrire(
+            cle, profondeur, _score_vers_table(meilleur_score, ply), drapeau, meilleur
+        )
+
+        return meilleur_score
+
+    def chercher(
+        self,
+        trait: Pion,
+        budget: float,
+        profondeur_max: int = 64,
+        profondeur_min: int = 1,
+    ) -> Resultat:
+        debut = time.perf_counter()
+        self.__fin = debut + budget
+        self.noeuds = 0
+
+        coups = self.damier.coups_legaux(trait)
+        if len(coups) <= 1:
+            return Resultat(
+                coups[0] if coups else None, 0, 0, 0, time.perf_counter() - debut
+            )
+
+        resultat = Resultat(coups[0], 0, 0, 0, 0.0)
+
+        for profondeur in range(profondeur_min, profondeur_max + 1):
+            try:
+                score = self.__negamax(trait, profondeur, -MAT - 1, MAT + 1, 0)
+            except _TempsEcoule:
+                break
+
+            resultat = Resultat(
+                coups[self.__racine],
+                score,
+                profondeur,
+                self.noeuds,
+                time.perf_counter() - debut,
+            )
+
+            if abs(score) >= MAT - 1000:
+                break
+
+        return resultat._replace(noeuds=self.noeuds, duree=time.perf_counter() - debut)
+
+
+def _score_vers_table(score: int, ply: int) -> int:
+    if score >= MAT - 1000:
+        return score + ply
+    if score <= -MAT + 1000:
+        return score - ply
+    return score
+
+
+def _score_depuis_table(score: int, ply: int) -> int:
+    if score >= MAT - 1000:
+        return score - ply
+    if score <= -MAT + 1000:
+        return score + ply
+    return score
+
+
+@cache
+def _tables(dossier: str, longueur: int, largeur: int) -> Tables:
+    # gardées d'un appel à l'autre dans chaque processus de calcul
+    return Tables(dossier, longueur, largeur)
+
+
+@cache
+def _livre(chemin: str) -> Livre | None:
+    return Livre(chemin) if os.path.exists(chemin) else None
+
+
+def analyser(
+    position: bytes,
+    trait: Pion | int,
+    budget: float,
+    finales: str | None = None,
+    ouvertures: str | None = None,
+) -> Resultat:
+    # point d'entrée des processus de calcul du serveur
+    debut = time.perf_counter()
+    # position au format de Damier.to_bytes
+    damier = Damier.from_bytes(position)
+    trait = Pion(trait)
+
+    if ouvertures and (livre := _livre(ouvertures)):
+        if coup := livre.choisir(damier, trait, random.Random()):
+            return Resultat(coup, 0, 0, 0, time.perf_counter() - debut)
+
+    tables = _tables(finales, damier.longueur, damier.largeur) if finales else None
+    return Recherche(damier, finales=tables).chercher(trait, budget)
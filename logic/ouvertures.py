@@ -0,0 +1,249 @@
+# livre d'ouvertures construit à partir d'archives de parties (voir logic.archive)
+#
+#   python -m logic.ouvertures livre.pdo parties.pda [autres.pda...] -t 10 -c 12
+#
+# Le livre est un fichier d'enregistrements de taille fixe triés par
+# (clé de position, source, cible) :
+#
+#   <QHHIi  clé Damier.cle(trait), case source et case cible (x * largeur + y),
+#           nombre de parties, somme des résultats pour le camp qui a joué
+#
+# La construction lit les parties une à une, trie des paquets en mémoire
+# dans des fichiers temporaires puis les fusionne : le nombre de parties
+# n'est pas limité par la mémoire.
+
+import argparse
+from bisect import bisect_left
+from collections.abc import Iterable, Iterator
+import heapq
+import mmap
+import os
+import random
+import struct
+import tempfile
+from typing import NamedTuple
+
+from . import archive
+from .damier import Coup, Damier, Pion
+
+ENTETE = b"PYDAMESO"
+_TAILLE = struct.Struct("<BB")
+_ENREGISTREMENT = struct.Struct("<QHHIi")
+
+
+class Entree(NamedTuple):
+    source: tuple[int, int]
+    cible: tuple[int, int]
+    parties: int
+    # somme des résultats pour le camp qui a joué le coup : +1 gain, -1 perte
+    score: int
+
+
+def _adversaire(trait: Pion) -> Pion:
+    return Pion.BLANC if trait == Pion.NOIR else Pion.NOIR
+
+
+def _positions(
+    parties: Iterable[archive.Partie], longueur: int, largeur: int, coups_max: int
+) -> Iterator[tuple[int, int, int, int]]:
+    # (clé, source, cible, résultat) pour les premiers coups de chaque partie
+    for partie in parties:
+        if (partie.longueur, partie.largeur) != (longueur, largeur):
+            continue
+
+        damier = Damier(longueur, largeur)
+        damier.installer()
+        trait = Pion.NOIR
+
+        for chemin in partie.coups[:coups_max]:
+            if chemin == archive.PASSE:
+                trait = _adversaire(trait)
+                continue
+
+            if not partie.gagnant:
+                resultat = 0
+            else:
+                resultat = 1 if partie.gagnant == trait else -1
+
+            (xs, ys), (xc, yc) = chemin[0], chemin[-1]
+            yield damier.cle(trait), xs * largeur + ys, xc * largeur + yc, resultat
+
+            for source, cible in zip(chemin, chemin[1:]):
+                damier.deplacer_pion(source, cible)
+            trait = _adversaire(trait)
+
+
+def _ecrire_paquet(compteurs: dict) -> str:
+    descripteur, chemin = tempfile.mkstemp(suffix=".pdo")
+    with os.fdopen(descripteur, "wb", buffering=1 << 20) as fichier:
+        for (cle, source, cible), (parties, score) in sorted(compteurs.items()):
+            fichier.write(_ENREGISTREMENT.pack(cle, source, cible, parties, score))
+    return chemin
+
+
+def _lire_paquet(chemin: str) -> Iterator[tuple[int, int, int, int, int]]:
+    with open(chemin, "rb", buffering=1 << 20) as fichier:
+        while donnees := fichier.read(_ENREGISTREMENT.size * 4096):
+            yield from _ENREGISTREMENT.iter_unpack(donnees)
+
+
+def construire(
+    chemin: str,
+    archives: Iterable[str],
+    longueur: int,
+    largeur: int,
+    coups_max: int = 12,
+    paquet: int = 1_000_000,
+) -> int:
+    # renvoie le nombre d'enregistrements du livre
+    compteurs = {}
+    paquets = []
+
+    try:
+        parties = (p for a in archives for p in archive.lire(a))
+        for cle, source, cible, resultat in _positions(
+            parties, longueur, largeur, coups_max
+        ):
+            entree = compteurs.get((cle, source, cible), (0, 0))
+            compteurs[cle, source, cible] = (entree[0] + 1, entree[1] + resultat)
+            if len(compteurs) >= paquet:
+                paquets.append(_ecrire_paquet(compteurs))
+                compteurs.clear()
+        if compteurs:
+            paquets.append(_ecrire_paquet(compteurs))
+            compteurs.clear()
+
+        # fusion des paquets triés, en additionnant les mêmes coups
+        n = 0
+        courant = None
+        with open(chemin + ".tmp", "wb", buffering=1 << 20) as fichier:
+            fichier.write(ENTETE + _TAILLE.pack(longueur, largeur))
+            for cle, source, cible, parties, score in heapq.merge(
+                *map(_lire_paquet, paquets)
+            ):
+                if courant and courant[:3] == [cle, source, cible]:
+                    courant[3] += parties
+                    courant[4] += score
+                    continue
+                if courant:
+                    fichier.write(_ENREGISTREMENT.pack(*courant))
+                    n += 1
+                courant = [cle, source, cible, parties, score]
+            if courant:
+                fichier.write(_ENREGISTREMENT.pack(*courant))
+                n += 1
+        os.replace(chemin + ".tmp", chemin)
+    finally:
+        for p in paquets:
+            os.remove(p)
+
+    return n
+
+
+class _Cles:
+    # vue des clés du livre pour bisect, sans rien copier
+    def __init__(self, donnees, debut: int, n: int):
+        self.donnees, self.debut, self.n = donnees, debut, n
+
+    def __len__(self):
+        return self.n
+
+    def __getitem__(self, i: int) -> int:
+        position = self.debut + i * _ENREGISTREMENT.size
+        return int.from_bytes(self.donnees[position : position + 8], "little")
+
+
+class Livre:
+    def __init__(self, chemin: str):
+        with open(chemin, "rb") as fichier:
+            self.__donnees = mmap.mmap(fichier.fileno(), 0, access=mmap.ACCESS_READ)
+
+        if self.__donnees[: len(ENTETE)] != ENTETE:
+            raise ValueError(f"{chemin} n'est pas un livre d'ouvertures")
+        self.longueur, self.largeur = _TAILLE.unpack_from(self.__donnees, len(ENTETE))
+
+        self.__debut = len(ENTETE) + _TAILLE.size
+        n = (len(self.__donnees) - self.__debut) // _ENREGISTREMENT.size
+        self.__cles = _Cles(self.__donnees, self.__debut, n)
+
+    def __len__(self):
+        return len(self.__cles)
+
+    def entrees(self, damier: Damier, trait: Pion) -> list[Entree]:
+        if (damier.longueur, damier.largeur) != (self.longueur, self.largeur):
+            return []
+
+        cle = damier.cle(trait)
+        entrees = []
+        i = bisect_left(self.__cles, cle)
+        while i < len(self.__cles):
+            c, source, cible, parties, score = _ENREGISTREMENT.unpack_from(
+                self.__donnees, self.__debut + i * _ENREGISTREMENT.size
+            )
+            if c != cle:
+                break
+            entrees.append(
+                Entree(
+                    divmod(source, self.largeur),
+                    divmod(cible, self.largeur),
+                    parties,
+                    score,
+                )
+            )
+            i += 1
+
+        return entrees
+
+    def choisir(
+        self,
+        damier: Damier,
+        trait: Pion,
+        aleatoire: random.Random | None = None,
+        parties_min: int = 1,
+    ) -> Coup | None:
+        # coup légal du livre, tiré selon le nombre de parties qui l'ont joué,
+        # ou le plus joué sans générateur aléatoire ; le livre ne garde que
+        # la source et la destination finale d'un coup : parmi les prises qui
+        # les relient, celle qui prend le plus de pions
+        coups = {}
+        for coup in damier.coups_legaux(trait):
+            autre = coups.get((coup.source, coup.cible))
+            if not autre or len(coup.sauts()) > len(autre.sauts()):
+                coups[coup.source, coup.cible] = coup
+        entrees = [
+            e
+            for e in self.entrees(damier, trait)
+            if e.parties >= parties_min and (e.source, e.cible) in coups
+        ]
+        if not entrees:
+            return None
+
+        if aleatoire:
+            entree = aleatoire.choices(entrees, [e.parties for e in entrees])[0]
+        else:
+            entree = max(entrees, key=lambda e: (e.parties, e.score))
+        return coups[entree.source, entree.cible]
+
+    def fermer(self):
+        self.__donnees.close()
+
+
+if __name__ == "__main__":
+    parseur = argparse.ArgumentParser(
+        prog="logic.ouvertures", description="Construit un livre d'ouvertures"
+    )
+    parseur.add_argument("livre", help="fichier du livre à écrire")
+    parseur.add_argument("archives", nargs="+", help="archives de parties")
+    parseur.add_argument("-t", "--taille", type=int, default=10)
+    parseur.add_argument(
+        "-c", "--coups", type=int, default=12, help="demi-coups retenus par partie"
+    )
+    parseur.add_argument(
+        "--paquet", type=int, default=1_000_000, help="entrées triées en mémoire"
+    )
+    args = parseur.parse_args()
+
+    n = construire(
+        args.livre, args.archives, args.taille, args.taille, args.coups, args.paquet
+    )
+    print(f"{n} entrées")
@@ -0,0 +1,203 @@
+# recherche parallèle « lazy SMP » : plusieurs processus cherchent la même
+# position et partagent une table de transposition en mémoire partagée
+#
+#   python -m logic.parallele -t 10 -c 20 -b 5 -j 1 2 4
+#
+# Chaque processus fait son propre approfondissement itératif ; les processus
+# auxiliaires commencent à des profondeurs décalées, si bien qu'ils remplissent
+# la table avec des positions que le processus principal retrouve ensuite.
+#
+# Expérimental : le gain en profondeur et en nœuds/s n'a pas encore été mesuré
+# sur une machine à plusieurs cœurs (comparer() sert à cette mesure), et
+# l'ordinateur du serveur (ia.analyser) ne s'en sert pas.
+
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import resource_tracker, shared_memory
+import os
+import time
+
+from .damier import Damier, Pion
+from .ia import MAT, Recherche, Resultat
+
+_MASQUE = (1 << 64) - 1
+
+
+class TablePartagee:
+    # même interface que ia.TableTransposition
+    #
+    # Une entrée occupe deux entiers de 64 bits : (clé ^ données, données).
+    # Deux processus peuvent écrire la même entrée en même temps sans verrou :
+    # une entrée mélangée ne vérifie plus clé ^ données et est ignorée.
+    #
+    # données : profondeur sur 8 bits, drapeau sur 2 bits, meilleur coup + 1
+    # sur 16 bits puis score + 2^31 sur 32 bits
+    def __init__(self, taille: int = 1 << 20, nom: str | None = None):
+        assert taille & (taille - 1) == 0, "la taille doit être une puissance de 2"
+
+        self.__proprietaire = nom is None
+        if nom is None:
+            self.memoire = shared_memory.SharedMemory(create=True, size=taille * 16)
+        else:
+            # le créateur est seul à détruire la mémoire partagée (voir executeur())
+            self.memoire = shared_memory.SharedMemory(nom)
+
+        self.taille = taille
+        self.__masque = taille - 1
+        self.__entrees = self.memoire.buf.cast("Q")
+
+    @property
+    def nom(self) -> str:
+        return self.memoire.name
+
+    def lire(self, cle: int) -> tuple[int, int, int, int | None] | None:
+        i = (cle & self.__masque) * 2
+        verification, donnees = self.__entrees[i], self.__entrees[i + 1]
+        if not donnees or verification ^ donnees != cle:
+            return None
+
+        meilleur = (donnees >> 10) & 0xFFFF
+        return (
+            donnees & 0xFF,
+            (donnees >> 26) - (1 << 31),
+            (donnees >> 8) & 0x3,
+            meilleur - 1 if meilleur else None,
+        )
+
+    def ecrire(
+        self, cle: int, profondeur: int, score: int, drapeau: int, meilleur: int | None
+    ):
+        i = (cle & self.__masque) * 2
+        verification, ancien = self.__entrees[i], self.__entrees[i + 1]
+        if ancien and verification ^ ancien == cle and ancien & 0xFF > profondeur:
+            return
+
+        donnees = (
+            min(profondeur, 0xFF)
+            | drapeau << 8
+            | (0 if meilleur is None else meilleur + 1) << 10
+            | (score + (1 << 31)) << 26
+        )
+        self.__entrees[i] = (cle ^ donnees) & _MASQUE
+        self.__entrees[i + 1] = donnees
+
+    def fermer(self):
+        self.__entrees.release()
+        self.memoire.close()
+        if self.__proprietaire:
+            self.memoire.unlink()
+
+
+_ouverte: TablePartagee | None = None
+
+
+def _table(nom: str, taille: int) -> TablePartagee:
+    # gardée ouverte dans chaque processus tant que la même table est utilisée
+    global _ouverte
+
+    if not _ouverte or _ouverte.nom != nom:
+        if _ouverte:
+            _ouverte.fermer()
+        _ouverte = TablePartagee(taille, nom)
+    return _ouverte
+
+
+def _chercher(
+    nom: str, taille: int, position: bytes, trait: int, budget: float, decalage: int
+) -> Resultat:
+    # point d'entrée des processus de recherche
+    damier = Damier.from_bytes(position)
+    recherche = Recherche(damier, _table(nom, taille))
+    return recherche.chercher(Pion(trait), budget, profondeur_min=1 + decalage)
+
+
+def executeur(processus: int) -> ProcessPoolExecutor:
+    # le suivi des ressources doit tourner avant la création des processus
+    # pour qu'ils le partagent : sinon chacun lance le sien, qui signale puis
+    # tente de détruire à la sortie les tables déjà détruites par le créateur
+    resource_tracker.ensure_running()
+    return ProcessPoolExecutor(processus)
+
+
+def chercher(
+    executeur: ProcessPoolExecutor,
+    processus: int,
+    damier: Damier,
+    trait: Pion,
+    budget: float,
+    taille: int = 1 << 20,
+) -> Resultat:
+    # le résultat est celui de la recherche la plus profonde, les nœuds
+    # sont ceux de tous les processus
+    debut = time.perf_counter()
+    table = TablePartagee(taille)
+
+    try:
+        futurs = [
+            executeur.submit(
+                _chercher,
+                table.nom,
+                taille,
+                damier.to_bytes(),
+                trait.value,
+                budget,
+                i % 2,
+            )
+            for i in range(processus)
+        ]
+        resultats = [f.result() for f in futurs]
+    finally:
+        table.fermer()
+
+    # à profondeur égale, le processus principal (le premier) l'emporte
+    meilleur = max(resultats, key=lambda r: r.profondeur)
+    return meilleur._replace(
+        noeuds=sum(r.noeuds for r in resultats), duree=time.perf_counter() - debut
+    )
+
+
+def comparer(taille: int, coups: int, budget: float, processus: list[int]):
+    from .benchmark import position_milieu
+
+    damier = position_milieu(Damier, taille, coups)
+    trait = Pion.NOIR
+
+    for n in processus:
+        with executeur(n) as processus_recherche:
+            # démarrage des processus hors mesure
+            processus_recherche.submit(int).result()
+            resultat = chercher(processus_recherche, n, damier, trait, budget)
+
+        score = resultat.score
+        if abs(score) >= MAT - 1000:
+            score = f"mat {MAT - abs(score)}"
+        print(
+            f"{n:>3} processus : profondeur {resultat.profondeur:>2}, "
+            f"{resultat.noeuds:>9} nœuds, {resultat.noeuds_par_seconde:>9.0f} nœuds/s, "
+            f"score {score}, coup {resultat.coup.chemin if resultat.coup else None}"
+        )
+
+
+if __name__ == "__main__":
+    parseur = argparse.ArgumentParser(
+        prog="logic.parallele", description="Recherche parallèle à mémoire partagée"
+    )
+    parseur.add_argument("-t", "--taille", type=int, default=10)
+    parseur.add_argument(
+        "-c",
+        "--coups",
+        type=int,
+        default=20,
+        help="coups aléatoires avant la recherche",
+    )
+    parseur.add_argument("-b", "--budget", type=float, default=5.0)
+    parseur.add_argument(
+        "-j",
+        "--processus",
+        type=int,
+        nargs="+",
+        default=[1, 2, os.cpu_count() or 1],
+    )
+    args = parseur.parse_args()
+
+    comparer(args.taille, args.coups, args.budget, args.processus)
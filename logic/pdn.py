@@ -0,0 +1,302 @@
+# lecture et écriture de parties au format PDN (Portable Draughts Notation)
+#
+#   python -m logic.pdn importer parties.pdn parties.pda -t 10
+#   python -m logic.pdn exporter parties.pda parties.pdn
+#
+# Les cases foncées (x + y impair) sont numérotées à partir de 1 depuis le
+# bord des blancs PDN, rangée par rangée. Le champ couleur de GameType dit qui
+# commence (les blancs « W » par défaut, les noirs « B » pour le type 21) : ce
+# camp joue nos noirs, installés en y = 0. Quand les blancs commencent, la
+# numérotation part donc de y = largeur - 1 et de x décroissant, sinon de y = 0
+# et de x croissant. Un coup s'écrit « 32-28 », une prise « 19x30 » ou
+# « 19x30x39 » avec les cases d'arrivée intermédiaires.
+# Le camp qui commence est le premier camp des résultats PDN (« 2-0 » ou
+# « 1-0 » : victoire de nos noirs). PDN ne note pas les passes d'un camp
+# bloqué : elles sont déduites à la lecture et omises à l'écriture.
+#
+# Lecture et écriture se font partie par partie sur des itérables de lignes,
+# la taille d'un fichier n'est donc pas limitée par la mémoire.
+
+import argparse
+from collections.abc import Iterable, Iterator
+from functools import cache
+import re
+from typing import NamedTuple
+
+from . import archive
+from .damier import Damier, Pion
+
+RESULTATS = {
+    "2-0": Pion.NOIR,
+    "1-0": Pion.NOIR,
+    "0-2": Pion.BLANC,
+    "0-1": Pion.BLANC,
+    "1-1": None,
+    "1/2-1/2": None,
+    "*": None,
+}
+
+_JETONS = re.compile(
+    r"""
+    \[(?P<tag>\w+)\s+"(?P<valeur>(?:[^"\\]|\\.)*)"\]    # paire [Tag "valeur"]
+    | (?P<resultat>(?:2-0|0-2|1-1|1-0|0-1|1/2-1/2)(?![\d/])|\*)  # avant « 1-10 »
+    | (?P<coup>\d+(?:[-x]\d+)+)                         # 32-28, 19x30x39
+    | (?P<commentaire>\{)                               # commentaire sur plusieurs lignes
+    | (?P<variante>\()
+    | \d+\.(?:\.\.)? | \$\d+ | [!?]+                    # numéros, annotations
+    """,
+    re.VERBOSE,
+)
+_VARIANTE = re.compile(r"[(){]")
+
+
+class PartiePDN(NamedTuple):
+    entetes: dict[str, str]
+    # numéros des cases de chaque coup, et s'il est noté comme une prise
+    coups: list[tuple[tuple[int, ...], bool]]
+    resultat: str
+
+
+@cache
+def _numerotation(
+    longueur: int, largeur: int, blancs: bool = True
+) -> tuple[tuple[tuple[int, int], ...], dict[tuple[int, int], int]]:
+    # blancs : les blancs PDN commencent, la case 1 est du côté de nos blancs
+    cases = tuple(
+        (x, y) for y in range(largeur) for x in range(longueur) if (x + y) % 2
+    )
+    if blancs:
+        cases = cases[::-1]
+    return cases, {case: n for n, case in enumerate(cases, 1)}
+
+
+def lire(lignes: Iterable[str]) -> Iterator[PartiePDN]:
+    entetes, coups = {}, []
+    commentaire = variante = 0
+
+    for ligne in lignes:
+        position = 0
+        while position < len(ligne):
+            if commentaire:
+                fin = ligne.find("}", position)
+                if fin < 0:
+                    break
+                commentaire, position = 0, fin + 1
+                continue
+
+            if variante:
+                # les variantes sont ignorées, y compris leurs commentaires
+                m = _VARIANTE.search(ligne, position)
+                if not m:
+                    break
+                position = m.end()
+                if m.group() == "{":
+                    commentaire = 1
+                else:
+                    variante += 1 if m.group() == "(" else -1
+                continue
+
+            m = _JETONS.search(ligne, position)
+            if not m:
+                break
+            position = m.end()
+
+            if m["tag"]:
+                if coups:
+                    # entête d'une nouvelle partie sans résultat dans la précédente
+                    yield PartiePDN(entetes, coups, "*")
+                    entetes, coups = {}, []
+                entetes[m["tag"]] = m["valeur"].replace('\\"', '"')
+            elif m["coup"]:
+                jeton = m["coup"]
+                coups.append((tuple(map(int, re.split("[-x]", jeton))), "x" in jeton))
+            elif m["resultat"]:
+                yield PartiePDN(entetes, coups, m["resultat"])
+                entetes, coups = {}, []
+            elif m["commentaire"]:
+                commentaire = 1
+            elif m["variante"]:
+                variante = 1
+
+    if entetes or coups:
+        yield PartiePDN(entetes, coups, "*")
+
+
+def _format(partie: PartiePDN, defaut: tuple[int, int]) -> tuple[int, int, bool]:
+    # GameType "type,couleur,colonnes,rangées,notation,inversion" : taille du
+    # damier et si les blancs PDN commencent
+    champs = [c.strip() for c in partie.entetes.get("GameType", "20").split(",")]
+    couleur = champs[1].upper() if len(champs) >= 2 else ""
+    if couleur not in ("W", "B"):
+        couleur = "B" if champs[0] == "21" else "W"
+
+    if len(champs) >= 4 and champs[2].isdigit() and champs[3].isdigit():
+        return int(champs[2]), int(champs[3]), couleur == "W"
+    return *defaut, couleur == "W"
+
+
+def _adversaire(trait: Pion) -> Pion:
+    return Pion.BLANC if trait == Pion.NOIR else Pion.NOIR
+
+
+def _chemin_prise(damier: Damier, trait: Pion, source, cible) -> tuple | None:
+    # prise notée seulement par ses extrémités : chaîne légale, complète ou
+    # arrêtée en cours, qui part de source et s'arrête sur cible
+    for coup in damier.coups_legaux(trait, source):
+        if coup.prises[0] and cible in coup.chemin[1:]:
+            return coup.chemin[: coup.chemin.index(cible, 1) + 1]
+    return None
+
+
+def valider(partie: PartiePDN, taille: tuple[int, int] = (10, 10)) -> archive.Partie:
+    # rejoue la partie depuis Damier.installer() ; ValueError au premier coup illégal
+    longueur, largeur, blancs = _format(partie, taille)
+    cases, _ = _numerotation(longueur, largeur, blancs)
+    damier = Damier(longueur, largeur)
+    damier.installer()
+
+    trait = Pion.NOIR
+    chemins = []
+    for numero, (numeros, prise) in enumerate(partie.coups, 1):
+        if not all(1 <= n <= len(cases) for n in numeros):
+            raise ValueError(f"coup {numero} : case hors du damier {numeros}")
+        chemin = tuple(cases[n - 1] for n in numeros)
+
+        pion = damier.obtenir_pion(*chemin[0])
+        if pion and pion.couleur() != trait and not damier.peut_jouer(trait):
+            # un camp bloqué passe son tour, ce que PDN ne note pas
+            chemins.append(archive.PASSE)
+            trait = _adversaire(trait)
+        if not pion or pion.couleur() != trait:
+            raise ValueError(f"coup {numero} : aucun pion à jouer en {numeros[0]}")
+
+        # on vérifie chaque étape sur les seules cases du pion joué,
+        # toutes les étapes d'un coup en plusieurs sauts doivent prendre
+        for source, cible in zip(chemin, chemin[1:]):
+            if cible not in damier.trouver_cases_possibles(*source):
+                break
+            if len(chemin) > 2 and not damier.deplacer_pion(source, cible, False):
+                break
+            damier.deplacer_pion(source, cible)
+        else:
+            chemins.append(chemin)
+            trait = _adversaire(trait)
+            continue
+
+        complet = _chemin_prise(damier, trait, *chemin) if len(chemin) == 2 else None
+        if not prise or not complet:
+            notation = ("x" if prise else "-").join(map(str, numeros))
+            raise ValueError(f"coup {numero} : {notation} illégal")
+
+        for source, cible in zip(complet, complet[1:]):
+            damier.deplacer_pion(source, cible)
+        chemins.append(complet)
+        trait = _adversaire(trait)
+
+    return archive.Partie(
+        longueur, largeur, tuple(chemins), RESULTATS.get(partie.resultat)
+    )
+
+
+def formater(partie: archive.Partie, entetes: dict[str, str] | None = None) -> str:
+    _, numeros = _numerotation(partie.longueur, partie.largeur)
+    if partie.gagnant == Pion.NOIR:
+        resultat = "2-0"
+    elif partie.gagnant == Pion.BLANC:
+        resultat = "0-2"
+    else:
+        resultat = "1-1"
+
+    entetes = {
+        "GameType": f"20,W,{partie.longueur},{partie.largeur},N2,0",
+        **(entetes or {}),
+        "Result": resultat,
+    }
+    lignes = [f'[{tag} "{valeur}"]' for tag, valeur in entetes.items()]
+
+    # les prises se reconnaissent en rejouant la partie
+    damier = Damier(partie.longueur, partie.largeur)
+    damier.installer()
+    texte, ligne = [], ""
+    for i, chemin in enumerate(partie.coups):
+        # i compte aussi les passes : i % 2 est le camp au trait
+        if chemin == archive.PASSE:
+            continue
+        prise = bool(damier.deplacer_pion(chemin[0], chemin[1], False))
+        for source, cible in zip(chemin, chemin[1:]):
+            damier.deplacer_pion(source, cible)
+
+        jeton = ("x" if prise else "-").join(str(numeros[c]) for c in chemin)
+        if i % 2 == 0:
+            jeton = f"{i // 2 + 1}. {jeton}"
+        elif partie.coups[i - 1] == archive.PASSE:
+            jeton = f"{i // 2 + 1}... {jeton}"
+        if len(ligne) + len(jeton) >= 80:
+            texte.append(ligne)
+            ligne = ""
+        ligne = f"{ligne} {jeton}" if ligne else jeton
+
+    texte.append(f"{ligne} {resultat}" if ligne else resultat)
+    return "\n".join(lignes + texte) + "\n\n"
+
+
+def ecrire(parties: Iterable[archive.Partie]) -> Iterator[str]:
+    for partie in parties:
+        yield formater(partie)
+
+
+def importer(
+    source: str, destination: str, taille: tuple[int, int] = (10, 10)
+) -> tuple[int, int]:
+    # renvoie le nombre de parties importées et rejetées
+    importees = rejetees = 0
+
+    with open(source, encoding="utf-8", errors="replace") as lignes, archive.Ecrivain(
+        destination
+    ) as ecrivain:
+        for numero, partie in enumerate(lire(lignes), 1):
+            try:
+                valide = valider(partie, taille)
+            except ValueError as e:
+                print(f"partie {numero} rejetée : {e}")
+                rejetees += 1
+                continue
+            ecrivain.ajouter(archive.encoder(*valide))
+            importees += 1
+
+    return importees, rejetees
+
+
+def exporter(source: str, destination: str) -> int:
+    n = 0
+    with open(destination, "w", encoding="utf-8") as fichier:
+        for texte in ecrire(archive.lire(source)):
+            fichier.write(texte)
+            n += 1
+    return n
+
+
+if __name__ == "__main__":
+    parseur = argparse.ArgumentParser(
+        prog="logic.pdn", description="Importe et exporte des parties PDN"
+    )
+    commandes = parseur.add_subparsers(dest="commande", required=True)
+
+    commande = commandes.add_parser("importer", help="PDN vers archive")
+    commande.add_argument("pdn")
+    commande.add_argument("archive")
+    commande.add_argument(
+        "-t", "--taille", type=int, default=10, help="taille sans entête GameType"
+    )
+
+    commande = commandes.add_parser("exporter", help="archive vers PDN")
+    commande.add_argument("archive")
+    commande.add_argument("pdn")
+
+    args = parseur.parse_args()
+
+    if args.commande == "importer":
+        importees, rejetees = importer(args.pdn, args.archive, (args.taille,) * 2)
+        print(f"{importees} parties importées, {rejetees} rejetées")
+    else:
+        print(f"{exporter(args.archive, args.pdn)} parties exportées")
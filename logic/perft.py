@@ -0,0 +1,189 @@
+# perft : nombre de positions atteintes à une profondeur donnée depuis Damier.installer()
+#
+#   python -m logic.perft                 vérifie les petites références de toutes les tailles
+#   python -m logic.perft -n 0            vérifie toutes les références
+#   python -m logic.perft -t 10 -p 6      compte une taille et une profondeur
+#   python -m logic.perft --liste         recompte avec DamierListe (lent, indépendant)
+#
+# Les noirs jouent en premier, un coup est une chaîne de sauts complète
+# (voir Damier.coups_legaux), un camp qui ne peut pas jouer est une feuille.
+
+import argparse
+import time
+
+from .damier import Damier, Pion
+from .damier_liste import DamierListe
+
+# nombres de positions aux profondeurs 1, 2, 3... pour chaque taille de damier
+REFERENCES = {
+    4: (3, 9, 16, 29, 51, 80, 167, 355, 904, 2425),
+    5: (4, 16, 48, 144, 416, 1072, 2342, 5544, 14470, 39998),
+    6: (5, 25, 141, 770, 4226, 22289, 115261, 579191),
+    7: (6, 36, 252, 1756, 13080, 95752, 717176),
+    8: (7, 49, 379, 2872, 23582, 189143),
+    9: (8, 64, 576, 5184, 51964, 517642),
+    10: (9, 81, 793, 7654, 79010, 801609),
+    11: (10, 100, 1100, 12092, 145584, 1744572),
+    12: (11, 121, 1431, 16748, 207750),
+    13: (12, 144, 1872, 24336, 342140),
+    14: (13, 169, 2341, 32170, 465434),
+    15: (14, 196, 2940, 44092, 708032),
+    16: (15, 225, 3571, 56320, 930350),
+    17: (16, 256, 4352, 73984, 1336316),
+    18: (17, 289, 5169, 91982),
+    19: (18, 324, 6156, 116956),
+    20: (19, 361, 7183, 142324),
+    21: (20, 400, 8400, 176400),
+    22: (21, 441, 9661, 210898),
+    23: (22, 484, 11132, 256028),
+    24: (23, 529, 12651, 301640),
+    25: (24, 576, 14400, 360000),
+    26: (25, 625, 16201, 418870),
+    27: (26, 676, 18252, 492796),
+    28: (27, 729, 20359, 567292),
+    29: (28, 784, 22736, 659344),
+    30: (29, 841, 25173, 751994),
+    31: (30, 900, 27900, 864892),
+    32: (31, 961, 30691, 978448),
+}
+
+
+def _adversaire(trait: Pion) -> Pion:
+    return Pion.BLANC if trait == Pion.NOIR else Pion.NOIR
+
+
+def perft(damier: Damier, trait: Pion, profondeur: int) -> int:
+    if profondeur == 0:
+        return 1
+
+    coups = damier.coups_legaux(trait)
+    if profondeur == 1:
+        return len(coups)
+
+    total = 0
+    for coup in coups:
+        damier.jouer(coup)
+        total += perft(damier, _adversaire(trait), profondeur - 1)
+        damier.annuler()
+
+    return total
+
+
+def _chaines_liste(damier: DamierListe, position: tuple[int, int]) -> list:
+    # positions obtenues en prolongeant un saut, comme le faisait le serveur
+    resultats = []
+
+    for cible in dict.fromkeys(damier.trouver_cases_possibles(*position)):
+        if not damier.deplacer_pion(position, cible, False):
+            continue
+
+        copie = DamierListe.from_matrice(damier.matrice)
+        copie.deplacer_pion(position, cible)
+        resultats.extend(_chaines_liste(copie, cible) or [copie])
+
+    return resultats
+
+
+def perft_liste(damier: DamierListe, trait: Pion, profondeur: int) -> int:
+    if profondeur == 0:
+        return 1
+
+    positions = []
+    for x in range(damier.longueur):
+        for y in range(damier.largeur):
+            pion = damier.obtenir_pion(x, y)
+            if not pion or pion.couleur() != trait:
+                continue
+
+            for cible in dict.fromkeys(damier.trouver_cases_possibles(x, y)):
+                copie = DamierListe.from_matrice(damier.matrice)
+                if copie.deplacer_pion((x, y), cible):
+                    positions.extend(_chaines_liste(copie, cible) or [copie])
+                else:
+                    positions.append(copie)
+
+    if profondeur == 1:
+        return len(positions)
+
+    return sum(perft_liste(p, _adversaire(trait), profondeur - 1) for p in positions)
+
+
+def mesurer(taille: int, profondeur: int, liste: bool = False) -> tuple[int, float]:
+    if liste:
+        damier = DamierListe(taille, taille)
+        damier.installer()
+        debut = time.perf_counter()
+        noeuds = perft_liste(damier, Pion.NOIR, profondeur)
+    else:
+        damier = Damier(taille, taille)
+        damier.installer()
+        debut = time.perf_counter()
+        noeuds = perft(damier, Pion.NOIR, profondeur)
+
+    return noeuds, time.perf_counter() - debut
+
+
+def verifier(
+    tailles,
+    profondeur_max: int | None = None,
+    liste: bool = False,
+    noeuds_max: int = 0,
+) -> bool:
+    succes = True
+    total_noeuds = total_duree = 0
+
+    for taille in tailles:
+        references = REFERENCES[taille][:profondeur_max]
+
+        for profondeur, attendu in enumerate(references, 1):
+            if noeuds_max and attendu > noeuds_max:
+                break
+
+            noeuds, duree = mesurer(taille, profondeur, liste)
+            total_noeuds += noeuds
+            total_duree += duree
+
+            statut = "ok" if noeuds == attendu else f"ERREUR (attendu {attendu})"
+            succes &= noeuds == attendu
+            print(
+                f"taille {taille:>2} profondeur {profondeur:>2} : {noeuds:>9} "
+                f"{noeuds / duree if duree else 0:>10.0f} nœuds/s  {statut}"
+            )
+
+    print(f"total : {total_noeuds} nœuds, {total_noeuds / total_duree:.0f} nœuds/s")
+    return succes
+
+
+if __name__ == "__main__":
+    parseur = argparse.ArgumentParser(
+        prog="logic.perft", description="Correction et vitesse du générateur de coups"
+    )
+    parseur.add_argument("-t", "--taille", type=int, help="taille du damier (4 à 32)")
+    parseur.add_argument("-p", "--profondeur", type=int, help="profondeur maximale")
+    parseur.add_argument(
+        "-n",
+        "--noeuds-max",
+        type=int,
+        default=200_000,
+        help="ignorer les références plus grandes (0 pour tout vérifier)",
+    )
+    parseur.add_argument(
+        "--liste",
+        action="store_true",
+        default=False,
+        help="compter avec l'ancienne implémentation DamierListe",
+    )
+    args = parseur.parse_args()
+
+    if (
+        args.taille
+        and args.profondeur
+        and (args.profondeur > len(REFERENCES.get(args.taille, ())))
+    ):
+        noeuds, duree = mesurer(args.taille, args.profondeur, args.liste)
+        print(f"{noeuds} nœuds en {duree:.2f} s, {noeuds / duree:.0f} nœuds/s")
+    else:
+        tailles = [args.taille] if args.taille else REFERENCES.keys()
+        noeuds_max = 0 if args.profondeur else args.noeuds_max
+        if not verifier(tailles, args.profondeur, args.liste, noeuds_max):
+            raise SystemExit(1)
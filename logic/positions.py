@@ -0,0 +1,226 @@
+# index des positions atteintes par les parties d'une archive (voir logic.archive)
+#
+#   python -m logic.positions ajouter index/ parties.pda    indexe les nouvelles parties
+#   python -m logic.positions fusionner index/
+#   python -m logic.positions chercher index/ parties.pda 12 30
+#                    parties qui passent par la position de la partie 12 au coup 30
+#
+# L'index est un dossier de séquences triées d'enregistrements de taille fixe :
+#
+#   <QII  Damier.hachage après le coup, numéro de la partie dans l'archive, coup
+#
+# Chaque ajout écrit une nouvelle séquence pour les parties arrivées depuis le
+# précédent ; au-delà de SEQUENCES_MAX, les séquences sont fusionnées en une
+# seule. Une recherche est une recherche dichotomique dans chaque séquence.
+
+import argparse
+import heapq
+import json
+import mmap
+import os
+import struct
+from collections.abc import Iterator
+from typing import NamedTuple
+
+from . import archive
+from .damier import Damier
+
+ENTETE = b"PYDAMESI"
+_ENREGISTREMENT = struct.Struct("<QII")
+_CLE = struct.Struct("<Q")
+
+SEQUENCES_MAX = 8
+
+
+class Occurrence(NamedTuple):
+    partie: int
+    # nombre de coups joués pour atteindre la position
+    coup: int
+
+
+def _etat(dossier: str) -> dict:
+    chemin = os.path.join(dossier, "etat.json")
+    if not os.path.exists(chemin):
+        return {"parties": 0, "sequences": [], "suivante": 0}
+    with open(chemin, encoding="utf-8") as fichier:
+        return json.load(fichier)
+
+
+def _enregistrer_etat(dossier: str, etat: dict):
+    # remplacement atomique : un index interrompu reste cohérent
+    chemin = os.path.join(dossier, "etat.json")
+    with open(chemin + ".tmp", "w", encoding="utf-8") as fichier:
+        json.dump(etat, fichier)
+    os.replace(chemin + ".tmp", chemin)
+
+
+def _ecrire_sequence(dossier: str, etat: dict, enregistrements) -> str:
+    nom = f"{etat['suivante']:06}.idx"
+    etat["suivante"] += 1
+
+    with open(os.path.join(dossier, nom), "wb", buffering=1 << 20) as fichier:
+        fichier.write(ENTETE)
+        for enregistrement in enregistrements:
+            fichier.write(_ENREGISTREMENT.pack(*enregistrement))
+    return nom
+
+
+def _lire_sequence(chemin: str) -> Iterator[tuple[int, int, int]]:
+    with open(chemin, "rb", buffering=1 << 20) as fichier:
+        fichier.read(len(ENTETE))
+        while donnees := fichier.read(_ENREGISTREMENT.size * 4096):
+            yield from _ENREGISTREMENT.iter_unpack(donnees)
+
+
+def _positions(partie: archive.Partie, numero: int) -> Iterator[tuple[int, int, int]]:
+    # le trait n'est pas dans la clé : une position est retrouvée quel que
+    # soit le camp qui doit la jouer
+    for coup, damier in enumerate(partie.rejouer(), 1):
+        yield damier.hachage, numero, coup
+
+
+def fusionner(dossier: str):
+    etat = _etat(dossier)
+    if len(etat["sequences"]) <= 1:
+        return
+
+    anciennes = etat["sequences"]
+    sequences = (_lire_sequence(os.path.join(dossier, nom)) for nom in anciennes)
+    etat["sequences"] = [_ecrire_sequence(dossier, etat, heapq.merge(*sequences))]
+    _enregistrer_etat(dossier, etat)
+
+    for nom in anciennes:
+        os.remove(os.path.join(dossier, nom))
+
+
+def ajouter(dossier: str, chemin_archive: str, paquet: int = 4_000_000) -> int:
+    # indexe les parties de l'archive qui ne le sont pas encore,
+    # renvoie leur nombre
+    os.makedirs(dossier, exist_ok=True)
+    etat = _etat(dossier)
+    premiere = etat["parties"]
+
+    parties = 0
+    enregistrements = []
+
+    def vider():
+        if enregistrements:
+            enregistrements.sort()
+            etat["sequences"].append(_ecrire_sequence(dossier, etat, enregistrements))
+            enregistrements.clear()
+
+    for partie in archive.lire(chemin_archive, premiere):
+        enregistrements.extend(_positions(partie, premiere + parties))
+        parties += 1
+        if len(enregistrements) >= paquet:
+            vider()
+    vider()
+
+    etat["parties"] = premiere + parties
+    _enregistrer_etat(dossier, etat)
+
+    if len(etat["sequences"]) > SEQUENCES_MAX:
+        fusionner(dossier)
+    return parties
+
+
+class _Sequence:
+    def __init__(self, chemin: str):
+        with open(chemin, "rb") as fichier:
+            self.donnees = mmap.mmap(fichier.fileno(), 0, access=mmap.ACCESS_READ)
+        if self.donnees[: len(ENTETE)] != ENTETE:
+            raise ValueError(f"{chemin} n'est pas une séquence d'index")
+        self.n = (len(self.donnees) - len(ENTETE)) // _ENREGISTREMENT.size
+
+    def __cle(self, i: int) -> int:
+        return _CLE.unpack_from(self.donnees, len(ENTETE) + i * _ENREGISTREMENT.size)[0]
+
+    def chercher(self, cle: int) -> Iterator[Occurrence]:
+        debut, fin = 0, self.n
+        while debut < fin:
+            milieu = (debut + fin) // 2
+            if self.__cle(milieu) < cle:
+                debut = milieu + 1
+            else:
+                fin = milieu
+
+        position = len(ENTETE) + debut * _ENREGISTREMENT.size
+        while position < len(self.donnees):
+            c, partie, coup = _ENREGISTREMENT.unpack_from(self.donnees, position)
+            if c != cle:
+                break
+            yield Occurrence(partie, coup)
+            position += _ENREGISTREMENT.size
+
+    def fermer(self):
+        self.donnees.close()
+
+
+class Index:
+    def __init__(self, dossier: str):
+        self.dossier = dossier
+        self.__noms = []
+        self.__sequences = []
+        self.actualiser()
+
+    def actualiser(self):
+        # à appeler après ajouter() ou fusionner() pour voir les nouvelles séquences
+        noms = _etat(self.dossier)["sequences"]
+        if noms == self.__noms:
+            return
+
+        for sequence in self.__sequences:
+            sequence.fermer()
+        self.__noms = noms
+        self.__sequences = [_Sequence(os.path.join(self.dossier, nom)) for nom in noms]
+
+    def chercher(self, damier: Damier, limite: int | None = None) -> list[Occurrence]:
+        resultats = []
+        for sequence in self.__sequences:
+            for occurrence in sequence.chercher(damier.hachage):
+                resultats.append(occurrence)
+                if limite and len(resultats) >= limite:
+                    return sorted(resultats)
+        return sorted(resultats)
+
+    def fermer(self):
+        for sequence in self.__sequences:
+            sequence.fermer()
+        self.__sequences = []
+
+
+if __name__ == "__main__":
+    parseur = argparse.ArgumentParser(
+        prog="logic.positions", description="Index des positions des parties"
+    )
+    commandes = parseur.add_subparsers(dest="commande", required=True)
+
+    commande = commandes.add_parser("ajouter", help="indexer les nouvelles parties")
+    commande.add_argument("index")
+    commande.add_argument("archive")
+
+    commande = commandes.add_parser("fusionner", help="fusionner les séquences")
+    commande.add_argument("index")
+
+    commande = commandes.add_parser(
+        "chercher", help="parties qui atteignent une position d'une partie"
+    )
+    commande.add_argument("index")
+    commande.add_argument("archive")
+    commande.add_argument("partie", type=int)
+    commande.add_argument("coup", type=int)
+
+    args = parseur.parse_args()
+
+    if args.commande == "ajouter":
+        print(f"{ajouter(args.index, args.archive)} parties indexées")
+    elif args.commande == "fusionner":
+        fusionner(args.index)
+    else:
+        partie = next(archive.lire(args.archive, args.partie))
+        for coup, damier in enumerate(partie.rejouer(), 1):
+            if coup == args.coup:
+                break
+        index = Index(args.index)
+        for occurrence in index.chercher(damier):
+            print(f"partie {occurrence.partie}, coup {occurrence.coup}")
@@ -7,7 +7,7 @@ from ormsgpack import MsgpackDecodeError
 
 from logic.damier import Pion, Damier
 import util
-from . import Paquet, PaquetClientType, PaquetServeurType
+from . import Paquet, PaquetClientType, PaquetServeurType, trame
 
 # Joueur
 reglages = util.reglages()
@@ -46,8 +46,8 @@ def paquet_handshake() -> Paquet:
     return Paquet([PaquetClientType.HANDSHAKE, reglages.pseudo, reglages.taille_damier])
 
 
-def paquet_salon(code: str) -> Paquet:
-    return Paquet([PaquetClientType.SALON, code])
+def paquet_salon(code: str, ia: bool = False) -> Paquet:
+    return Paquet([PaquetClientType.SALON, code, ia])
 
 
 def paquet_pret() -> Paquet:
@@ -80,9 +80,7 @@ def envoyer(paquet: Paquet):
         erreur("sock est None !")
         return
 
-    octets = paquet.serialiser()
-    octets = len(octets).to_bytes(4, byteorder="little", signed=False) + octets
-    sock.sendall(octets)
+    sock.sendall(trame.encoder(paquet.serialiser()))
 
 
 def thread_client():
@@ -99,96 +97,89 @@ def thread_client():
     global selection
     global messages
 
-    while sock:
-        parties = []
-        octets = sock.recv(4)
+    decodeur = trame.Decodeur()
 
-        if not octets:
+    while sock:
+        if not decodeur.recevoir(sock):
             erreur("la connexion a été fermée")
             return
 
-        if len(octets) < 4:
-            erreur("paquet mal formé, header taille invalide")
-            return
-
-        taille_paquet = int.from_bytes(octets[:4], byteorder="little", signed=False)
-
-        while sock:
-            total = sum([len(x) for x in parties])
-            if total >= taille_paquet:
-                break
-
-            parties.append(sock.recv(taille_paquet - total))
-
-        octets = b"".join(parties)
-
         try:
-            paquet = Paquet.deserialiser(octets)
-        except MsgpackDecodeError:
-            erreur("paquet mal formé, erreur msgpack")
-            return
-        except ValueError as e:
+            trames = list(decodeur.trames())
+        except trame.TrameTropGrande as e:
             erreur(e)
             return
 
-        # print(f"reçu paquet: {paquet.x}")
+        for octets in trames:
+            try:
+                paquet = Paquet.deserialiser(octets)
+            except MsgpackDecodeError:
+                erreur("paquet mal formé, erreur msgpack")
+                return
+            except ValueError as e:
+                erreur(e)
+                return
 
-        try:
-            match paquet.type():
-                case PaquetServeurType.HANDSHAKE.value:
-                    envoyer(paquet_handshake())
-                    print("Connexion au serveur pydames établie")
-                    connexion_succes = True
-                case PaquetServeurType.ERREUR.value:
-                    erreur(paquet.x[1])
-                    return
-                case PaquetServeurType.SALON.value:
-                    salon = paquet.x[1]
-                    print(f"code salon : {salon}")
-                case PaquetServeurType.ATTENTE.value:
-                    print("L'adversaire s'est déconnecté du serveur.")
-                    pret = False
-                    attente = True
-                case PaquetServeurType.LANCEMENT.value:
-                    attente = False
-                    damier = Damier.from_matrice(paquet.x[1])
-                case PaquetServeurType.CONCLUSION.value:
-                    print("La partie est finie.")
-                    attente = True
-                    gagnant = paquet.x[1]
-
-                    if gagnant:
-                        print(
-                            "Les",
-                            "noirs" if gagnant == Pion.NOIR.value else "blancs",
-                            "ont remporté la victoire.",
-                        )
-                    else:
-                        print("Il n'y a aucun gagnant ni perdant.")
-
-                    arreter()
-                    return
-                case PaquetServeurType.COULEUR.value:
-                    couleur = Pion(paquet.x[1])
-                case PaquetServeurType.DEPLACEMENTS.value:
-                    tour = False
-
-                    for i in range(0, len(paquet.x[1]), 2):
-                        source, cible = tuple(paquet.x[1][i]), tuple(paquet.x[1][i + 1])
-                        deplacements.extend([source, cible])
-                        sauts.extend(damier.deplacer_pion(source, cible))
-                case PaquetServeurType.TOUR.value:
-                    tour = True
-                    selection = paquet.x[1]
-                case PaquetServeurType.TCHAT.value:
-                    pseudo, message = paquet.x[1], paquet.x[2]
-                    messages.append(Message(pseudo, message))
-                case _:
-                    erreur("paquet de type inconnu")
-                    return
-        except (IndexError, KeyError):
-            erreur(f"paquet mal formé ({paquet.x})")
-            return
+            # print(f"reçu paquet: {paquet.x}")
+
+            try:
+                match paquet.type():
+                    case PaquetServeurType.HANDSHAKE.value:
+                        envoyer(paquet_handshake())
+                        print("Connexion au serveur pydames établie")
+                        connexion_succes = True
+                    case PaquetServeurType.ERREUR.value:
+                        erreur(paquet.x[1])
+                        return
+                    case PaquetServeurType.SALON.value:
+                        salon = paquet.x[1]
+                        print(f"code salon : {salon}")
+                    case PaquetServeurType.ATTENTE.value:
+                        print("L'adversaire s'est déconnecté du serveur.")
+                        pret = False
+                        attente = True
+                    case PaquetServeurType.LANCEMENT.value:
+                        attente = False
+                        damier = Damier.from_bytes(paquet.x[1])
+                    case PaquetServeurType.CONCLUSION.value:
+                        print("La partie est finie.")
+                        attente = True
+                        gagnant = paquet.x[1]
+
+                        if gagnant:
+                            print(
+                                "Les",
+                                "noirs" if gagnant == Pion.NOIR.value else "blancs",
+                                "ont remporté la victoire.",
+                            )
+                        else:
+                            print("Il n'y a aucun gagnant ni perdant.")
+
+                        arreter()
+                        return
+                    case PaquetServeurType.COULEUR.value:
+                        couleur = Pion(paquet.x[1])
+                    case PaquetServeurType.DEPLACEMENTS.value:
+                        tour = False
+
+                        for i in range(0, len(paquet.x[1]), 2):
+                            source, cible = tuple(paquet.x[1][i]), tuple(
+                                paquet.x[1][i + 1]
+                            )
+                            deplacements.extend([source, cible])
+                            sauts.extend(damier.deplacer_pion(source, cible))
+                    case PaquetServeurType.TOUR.value:
+                        tour = True
+                        selection = paquet.x[1]
+                    case PaquetServeurType.TCHAT.value:
+                        pseudo, message = paquet.x[1], paquet.x[2]
+                        messages.append(Message(pseudo, message))
+                    case _:
+                        erreur("paquet de type inconnu")
+                        return
+            except (IndexError, KeyError):
+                erreur(f"paquet mal formé ({paquet.x})")
+                return
 
 
 def demarrer(destination: str, port: int):
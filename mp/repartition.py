@@ -0,0 +1,245 @@
+# mode "processus" du serveur : les salons sont répartis entre plusieurs
+# processus, qui ont chacun leur boucle asyncio et leur GIL
+#
+# Un répartiteur accepte les connexions, envoie la poignée de main du serveur
+# et lit les paquets du client jusqu'au choix du salon (ou jusqu'à l'identifiant
+# d'un flux de captures). Le code du salon désigne le processus : les joueurs
+# d'un salon et les flux de ses captures arrivent tous au même. La socket et les
+# octets déjà lus lui sont alors transmis par une paire de sockets Unix.
+#
+# Les pseudonymes sont réservés par le répartiteur dès la poignée de main du
+# client, et libérés par le processus quand la connexion se ferme : ils restent
+# uniques sur tout le serveur.
+
+import asyncio
+import multiprocessing
+import socket
+import threading
+import traceback
+import zlib
+
+import ormsgpack
+
+from . import Paquet, PaquetClientType, trame
+
+# la poignée de main et le choix du salon tiennent en quelques dizaines d'octets
+PRELUDE_MAX = 1 << 16
+# message qui transmet une connexion : le prélude, un pseudonyme valide et
+# l'entête msgpack ; les processus lisent leur canal avec un tampon de cette taille
+MESSAGE_MAX = PRELUDE_MAX + 256
+
+
+def pseudo_valide(pseudo) -> bool:
+    return isinstance(pseudo, str) and 3 <= len(pseudo) <= 24
+
+
+def _pseudo(octets: memoryview) -> str | None:
+    # pseudonyme d'une poignée de main du client, "" s'il est invalide
+    if octets[:4] == b"flux":
+        return None
+    try:
+        paquet = Paquet.deserialiser(octets)
+        if paquet.type() == PaquetClientType.HANDSHAKE.value:
+            pseudo = paquet.x[1]
+            return pseudo if pseudo_valide(pseudo) else ""
+    except (ValueError, IndexError):
+        pass
+    return None
+
+
+def processus_du_salon(code: str, nombre: int) -> int:
+    # les codes tirés par un processus sont ceux de ReserveCodes(indice, nombre)
+    if code.isascii() and code.isdigit():
+        return int(code) % nombre
+    return zlib.crc32(code.encode("utf-8")) % nombre
+
+
+class _Accueil(asyncio.BufferedProtocol):
+    # connexion dont le processus n'est pas encore connu
+    def __init__(self, repartiteur: "Repartiteur"):
+        self.repartiteur = repartiteur
+        # pseudonyme réservé, à libérer si la connexion n'est pas transmise
+        self.pseudo = None
+
+    def connection_made(self, transport: asyncio.Transport):
+        self.transport = transport
+        self.decodeur = trame.Decodeur(PRELUDE_MAX, 4096)
+        self.prelude = bytearray()
+        self.repartiteur.accueils.add(self)
+        transport.write(self.repartiteur.handshake)
+
+    def get_buffer(self, sizehint: int) -> memoryview:
+        self.espace = self.decodeur.espace()
+        return self.espace
+
+    def buffer_updated(self, nbytes: int):
+        self.prelude += self.espace[:nbytes]
+        self.decodeur.recu(nbytes)
+        if len(self.prelude) > PRELUDE_MAX:
+            self.transport.close()
+            return
+
+        try:
+            for octets in self.decodeur.trames():
+                if self.pseudo is None and (pseudo := _pseudo(octets)) is not None:
+                    if not pseudo:
+                        self.transport.write(self.repartiteur.pseudo_invalide)
+                        self.transport.close()
+                        return
+                    if pseudo in self.repartiteur.pseudos:
+                        self.transport.write(self.repartiteur.pseudo_pris)
+                        self.transport.close()
+                        return
+                    self.repartiteur.pseudos.add(pseudo)
+                    self.pseudo = pseudo
+
+                indice = self.repartiteur.destination(octets)
+                if indice is not None:
+                    if self.repartiteur.transmettre(
+                        indice, self.transport, self.prelude, self.pseudo
+                    ):
+                        self.pseudo = None  # libéré désormais par le processus
+                    self.transport.close()
+                    return
+        except trame.TrameTropGrande:
+            self.transport.close()
+
+    def connection_lost(self, exc: Exception | None):
+        self.repartiteur.accueils.discard(self)
+        if self.pseudo is not None:
+            self.repartiteur.pseudos.discard(self.pseudo)
+
+
+class Repartiteur:
+    def __init__(
+        self,
+        destination: str,
+        port: int,
+        nombre: int,
+        cible,
+        handshake: bytes,
+        pseudo_invalide: bytes,
+        pseudo_pris: bytes,
+    ):
+        # cible(canal, indice, nombre) est exécutée dans chaque processus ;
+        # handshake, pseudo_invalide et pseudo_pris sont des paquets du
+        # serveur déjà encodés
+        self.nombre, self.handshake = nombre, handshake
+        self.pseudo_invalide, self.pseudo_pris = pseudo_invalide, pseudo_pris
+        self.suivant = 0
+        self.accueils = set()
+        # pseudonymes des connexions ouvertes, modifiés seulement par la boucle
+        self.pseudos = set()
+        self.canaux, self.processus = [], []
+
+        # "spawn" : les processus ne doivent hériter ni des threads ni des
+        # verrous du processus principal
+        contexte = multiprocessing.get_context("spawn")
+        for indice in range(nombre):
+            canal, extremite = socket.socketpair(socket.AF_UNIX, socket.SOCK_SEQPACKET)
+            processus = contexte.Process(
+                target=cible,
+                args=(extremite, indice, nombre),
+                name=f"pydames-{indice}",
+            )
+            processus.start()
+            extremite.close()
+
+            self.canaux.append(canal)
+            self.processus.append(processus)
+
+        self.boucle = asyncio.new_event_loop()
+        for canal in self.canaux:
+            self.boucle.add_reader(canal, self.lire_canal, canal)
+        self.serveur = self.boucle.run_until_complete(
+            self.boucle.create_server(
+                lambda: _Accueil(self), destination, port, reuse_address=True
+            )
+        )
+        self.thread = threading.Thread(target=self.boucle.run_forever)
+        self.thread.start()
+
+    def destination(self, octets: memoryview) -> int | None:
+        # processus qui doit servir la connexion, None s'il faut lire la suite
+        if octets[:4] == b"flux":
+            flux_id = bytes(octets[4:]).decode("utf-8", "replace")
+            return processus_du_salon(flux_id.partition("/")[0], self.nombre)
+
+        try:
+            paquet = Paquet.deserialiser(octets)
+            match paquet.type():
+                case PaquetClientType.HANDSHAKE.value:
+                    return None
+                case PaquetClientType.SALON.value:
+                    code = paquet.x[1]
+                    if code and isinstance(code, str):
+                        return processus_du_salon(code, self.nombre)
+        except (ValueError, IndexError):
+            pass
+
+        # nouveau salon, ou paquet que le processus refusera : chacun son tour
+        self.suivant = (self.suivant + 1) % self.nombre
+        return self.suivant
+
+    def lire_canal(self, canal: socket.socket):
+        # messages des processus : pseudonymes des connexions fermées
+        while True:
+            try:
+                message = canal.recv(1024, socket.MSG_DONTWAIT)
+            except BlockingIOError:
+                return
+            if not message:
+                self.boucle.remove_reader(canal)  # processus terminé
+                return
+
+            commande = ormsgpack.unpackb(message)
+            if commande[0] == "liberer":
+                self.pseudos.discard(commande[1])
+
+    def transmettre(
+        self, indice: int, transport: asyncio.Transport, prelude, pseudo: str | None
+    ) -> bool:
+        message = ormsgpack.packb(["connexion", bytes(prelude), pseudo])
+        if len(message) > MESSAGE_MAX:
+            print(f"prélude de {len(message)} octets, connexion refusée")
+            return False
+
+        sock = transport.get_extra_info("socket")
+        try:
+            socket.send_fds(self.canaux[indice], [message], [sock.fileno()])
+            return True
+        except OSError:
+            print(f"processus {indice} injoignable :")
+            print(traceback.format_exc())
+            return False
+
+    def envoyer(self, indice: int, *commande):
+        try:
+            self.canaux[indice].send(ormsgpack.packb(list(commande)))
+        except OSError:
+            print(f"processus {indice} injoignable :")
+            print(traceback.format_exc())
+
+    def diffuser(self, *commande):
+        for indice in range(self.nombre):
+            self.envoyer(indice, *commande)
+
+    def arreter(self):
+        def fermer():
+            self.serveur.close()
+            for accueil in self.accueils:
+                accueil.transport.close()
+            asyncio.get_running_loop().stop()
+
+        self.boucle.call_soon_threadsafe(fermer)
+        self.thread.join()
+        self.boucle.run_until_complete(asyncio.sleep(0))
+        self.boucle.close()
+
+        self.diffuser("arreter")
+        for processus in self.processus:
+            processus.join(10)
+            if processus.is_alive():
+                processus.terminate()
+        for canal in self.canaux:
+            canal.close()
@@ -1,34 +1,102 @@
+import asyncio
 import cmd
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 import datetime
+import functools
 import json
+import os
 import random
 import select
+import socket
 import socketserver
 import sys
 import threading
 import traceback
 import urllib.request
 
+import ormsgpack
 from ormsgpack import MsgpackDecodeError
 from mysql.connector import Error as ConnectorError
 
-from . import Paquet, PaquetClientType, PaquetServeurType
-from logic.damier import Pion, Damier
+from . import Paquet, PaquetClientType, PaquetServeurType, repartition, trame
+from logic import ia
+from logic.damier import Coup, Pion, Damier, TAILLE_MAX, TAILLE_MIN, indexer_coups
 from util import configuration
 import bdd
 
 _serv = None
+_boucle = None
 _thread = None
 _thread_captures = None
+_processus_ia = None
 _event_captures = None
-_file_captures = []
+# appels bloquants à la base de données et au site PHP, voir _en_fond
+_fond = None
 _lock = threading.Lock()
 
+# mode "processus" : le répartiteur dans le processus principal, et dans chaque
+# processus de jeu le canal qui le relie au répartiteur et (indice, nombre)
+_repartiteur = None
+_canal = None
+_repartition = (0, 1)
+_arret_demande = threading.Event()
+
 _base = None
 _url_php = None
-_clients = {}
 
-_salons = []
+# registres des connexions et des salons, modifiés sous _lock_registres
+_lock_registres = threading.RLock()
+_clients = {}
+# connexions de flux abonnées à chaque identifiant de captures
+_flux = {}
+_pseudos = {}  # pseudo -> connexion
+_salons = {}  # code -> Salon
+_salons_clients = {}  # connexion -> Salon
+
+
+class ReserveCodes:
+    # codes de salon à 4 chiffres encore libres : tirage, prise d'un code
+    # choisi par un joueur et remise en temps constant ; en mode "processus",
+    # seulement les codes que le répartiteur envoie au processus indice
+    def __init__(self, indice: int = 0, nombre: int = 1, taille: int = 10000):
+        self.__taille, self.__indice, self.__nombre = taille, indice, nombre
+        self.__codes = [f"{i:04}" for i in range(indice, taille, nombre)]
+        self.__positions = {code: i for i, code in enumerate(self.__codes)}
+
+    def __len__(self):
+        return len(self.__codes)
+
+    def __retirer(self, i: int) -> str:
+        # le dernier code prend la place du code retiré
+        code, dernier = self.__codes[i], self.__codes.pop()
+        del self.__positions[code]
+        if dernier != code:
+            self.__codes[i] = dernier
+            self.__positions[dernier] = i
+        return code
+
+    def tirer(self) -> str:
+        return self.__retirer(random.randrange(len(self.__codes)))
+
+    def prendre(self, code: str):
+        if (i := self.__positions.get(code)) is not None:
+            self.__retirer(i)
+
+    def rendre(self, code: str):
+        if (
+            len(code) == 4
+            and code.isascii()
+            and code.isdigit()
+            and int(code) < self.__taille
+            and int(code) % self.__nombre == self.__indice
+            and code not in self.__positions
+        ):
+            self.__positions[code] = len(self.__codes)
+            self.__codes.append(code)
+
+
+_codes = ReserveCodes()
 
 
 class Statistiques:
@@ -57,25 +125,39 @@ class Statistiques:
 
 class Salon:
     def __init__(
-        self, code: str | None = None, taille_damier: tuple[int, int] | None = None
+        self,
+        code: str | None = None,
+        taille_damier: tuple[int, int] | None = None,
+        ia: bool = False,
     ):
-        while not code or any(s for s in _salons if s.code == code):
-            code = f"{random.randint(0, 9999):04}"
+        # appelé sous _lock_registres, le code ne doit pas être déjà utilisé
+        if code:
+            _codes.prendre(code)
+        else:
+            code = _codes.tirer()
 
         (
             self.__code,
             self.__sock_noir,
             self.__sock_blanc,
             self.__joueurs,
+            self.__ia,
         ) = (
             code,
             None,
             None,
             {},
+            ia,
         )
         self.clients = []
-        self.id = _base.ajouter_jeu() if _base else None
-        self.partie = Partie(self.id, taille_damier)
+        self.id = None
+        self.partie = Partie(None, taille_damier)
+        if _base:
+            _en_fond(self.__ajouter_jeu)
+
+    def __ajouter_jeu(self):
+        if _base:
+            self.id = self.partie.id_jeu = _base.ajouter_jeu()
 
     @property
     def code(self):
@@ -93,11 +175,19 @@ class Salon:
     def joueurs(self) -> dict[str, int]:
         return self.__joueurs.copy()
 
+    @property
+    def ia(self) -> bool:
+        return self.__ia
+
+    @property
+    def complet(self) -> bool:
+        return len(self.clients) + int(self.__ia) >= 2
+
     def affecter_sockets(self):
-        assert len(self.clients) == 2
+        assert self.complet
 
         self.__sock_noir = self.clients[0]
-        self.__sock_blanc = self.clients[1]
+        self.__sock_blanc = None if self.__ia else self.clients[1]
 
     def couleur(self, sock) -> Pion | None:
         if sock == self.__sock_noir:
@@ -119,8 +209,11 @@ class Salon:
                 return None
 
     def creer_joueur(self, pseudo: str):
-        if _base:
-            self.__joueurs[pseudo] = _base.ajouter_joueur(pseudo)
+        def ajouter():
+            if _base:
+                self.__joueurs[pseudo] = _base.ajouter_joueur(pseudo)
+
+        _en_fond(ajouter)
 
     def obtenir_joueur(self, pseudo: str) -> int | None:
         return self.__joueurs.get(pseudo)
@@ -128,11 +221,15 @@ class Salon:
 
 class Partie:
     def __init__(self, id_jeu: int, taille_damier: tuple[int, int] | None = None):
-        self.__id_jeu = id_jeu
+        self.id_jeu = id_jeu
         self.damier = Damier(*(taille_damier or (8, 8)))
         self.__id_noir = self.__id_blanc = self.__debut = self.__fin = (
             self.stat_noir
         ) = self.stat_blanc = None
+        self.ia_en_cours = False
+        # camp qui doit jouer, et ses coups légaux calculés une fois par tour
+        self.__trait = self.__coups = None
+        self.__saut_en_cours = False
 
     @property
     def debut(self) -> datetime.datetime:
@@ -142,35 +239,79 @@ class Partie:
     def fin(self) -> datetime.datetime:
         return self.__fin
 
+    @property
+    def trait(self) -> Pion | None:
+        return self.__trait
+
+    @property
+    def saut_en_cours(self) -> bool:
+        # le joueur a sauté et peut encore prolonger sa prise
+        return self.__saut_en_cours
+
+    def coups(self) -> dict[tuple, list[Coup]]:
+        # coups du camp qui a le trait
+        if self.__coups is None:
+            self.__coups = indexer_coups(self.damier.coups_legaux(self.__trait))
+        return self.__coups
+
+    def deplacer(self, source: tuple[int, int], cible: tuple[int, int]) -> list:
+        # joue une étape d'un coup de coups() ; pendant une prise en plusieurs
+        # sauts, seules les suites de cette prise restent jouables, sinon le
+        # trait passe à l'adversaire
+        suites = [
+            Coup(c.chemin[1:], c.prises[1:])
+            for c in self.__coups[source, cible]
+            if len(c.chemin) > 2
+        ]
+        sauts = self.damier.deplacer_pion(source, cible)
+
+        if suites:
+            self.__coups = indexer_coups(suites)
+            self.__saut_en_cours = True
+        else:
+            self.terminer_tour()
+        return sauts
+
+    def jouer(self, coup: Coup):
+        for source, cible in zip(coup.chemin, coup.chemin[1:]):
+            self.damier.deplacer_pion(source, cible)
+        self.terminer_tour()
+
+    def terminer_tour(self):
+        # le trait passe à l'adversaire
+        self.__trait = Pion.BLANC if self.__trait == Pion.NOIR else Pion.NOIR
+        self.__coups = None
+        self.__saut_en_cours = False
+
+    def est_bloque(self) -> bool:
+        if self.__coups:
+            return False
+        return self.damier.est_bloque()
+
     def demarrer(self, noir: str, blanc: str):
         self.damier.vider()
         self.damier.installer()
+        self.__trait, self.__coups = Pion.NOIR, None
+        self.__saut_en_cours = False
 
-        if _base:
-            self.__id_noir, self.__id_blanc = (
-                _base.ajouter_joueur(noir),
-                _base.ajouter_joueur(blanc),
-            )
+        def ajouter_joueurs():
+            if _base:
+                self.__id_noir, self.__id_blanc = (
+                    _base.ajouter_joueur(noir),
+                    _base.ajouter_joueur(blanc),
+                )
+
+        _en_fond(ajouter_joueurs)
 
         self.stat_noir = Statistiques(
             0,
             0,
-            sum(
-                1
-                for ligne in self.damier.matrice
-                for p in ligne
-                if p == Pion.NOIR or p == Pion.DAME_NOIR
-            ),
+            self.damier.compter(Pion.NOIR) + self.damier.compter(Pion.DAME_NOIR),
         )
         self.stat_blanc = Statistiques(
             0,
             0,
-            sum(
-                1
-                for ligne in self.damier.matrice
-                for p in ligne
-                if p == Pion.BLANC or p == Pion.DAME_BLANC
-            ),
+            self.damier.compter(Pion.BLANC) + self.damier.compter(Pion.DAME_BLANC),
         )
 
         self.__debut = datetime.datetime.now()
@@ -180,40 +321,46 @@ class Partie:
         self.__fin = datetime.datetime.now()
 
         try:
+            noir, blanc = (
+                (s.score, s.dames, s.pions_restants)
+                for s in (self.stat_noir, self.stat_blanc)
+            )
+        except AttributeError:
+            return  # partie jamais démarrée
+        debut, fin = str(self.__debut), str(self.__fin)
+
+        def enregistrer():
             if _base:
-                id_stat_noir = _base.ajouter_statistiques(
-                    self.stat_noir.score,
-                    self.stat_noir.dames,
-                    self.stat_noir.pions_restants,
-                )
-                id_stat_blanc = _base.ajouter_statistiques(
-                    self.stat_blanc.score,
-                    self.stat_blanc.dames,
-                    self.stat_blanc.pions_restants,
-                )
+                id_stat_noir = _base.ajouter_statistiques(*noir)
+                id_stat_blanc = _base.ajouter_statistiques(*blanc)
 
                 id_equipe_noir = _base.ajouter_equipe(self.__id_noir, id_stat_noir)
                 id_equipe_blanc = _base.ajouter_equipe(self.__id_blanc, id_stat_blanc)
 
                 _base.ajouter_partie(
-                    self.__id_jeu,
-                    id_equipe_noir,
-                    id_equipe_blanc,
-                    str(self.__debut),
-                    str(self.__fin),
+                    self.id_jeu, id_equipe_noir, id_equipe_blanc, debut, fin
                 )
-        except AttributeError:
-            pass
+
+        _en_fond(enregistrer)
 
 
 class DonneesClient:
-    def __init__(self):
+    def __init__(self, reveil=None):
         self.etat_pret, self.pseudo, self.taille_damier, self.file_paquets = (
             False,
             None,
             None,
-            [],
+            deque(),
         )
+        # identifiant des captures transmises à une connexion de flux
+        self.flux_id = None
+        # réveille le transport qui envoie file_paquets, depuis n'importe quel thread
+        self.reveil = reveil
+
+    def ajouter(self, octets: bytes):
+        self.file_paquets.append(octets)
+        if self.reveil:
+            self.reveil()
 
     def __eq__(self, autre):
         return (self.etat_pret, self.pseudo, self.taille_damier, self.file_paquets) == (
@@ -224,364 +371,572 @@ class DonneesClient:
         )
 
 
-class Gestionnaire(socketserver.BaseRequestHandler):
-    def setup(self):
-        global _clients
-
-        _clients[self.request] = DonneesClient()
+class Session:
+    # logique d'une connexion, commune aux deux modes du serveur : le transport
+    # passe chaque paquet reçu à recevoir() et envoie file_paquets quand
+    # DonneesClient.reveil est appelé
+    def __init__(self, client, adresse: str, reveil=None):
+        self.client, self.adresse = client, adresse
+        self.salon = None
+        _clients[client] = DonneesClient(reveil)
 
     def erreur(self, *args, **kwargs):
-        print(f"({self.client_address[0]}) erreur :", *args, file=sys.stderr, **kwargs)
+        print(f"({self.adresse}) erreur :", *args, file=sys.stderr, **kwargs)
         self.envoyer(_paquet_erreur(" ".join(map(str, args))))
 
     def envoyer(self, paquet: Paquet):
-        _envoyer(self.request, paquet)
+        _envoyer(self.client, paquet)
 
-    def handle(self):
-        global _clients
-        global _file_captures
+    def ouvrir(self):
+        self.envoyer(_paquet_handshake())
+
+    def lire(self, decodeur: trame.Decodeur) -> bool:
+        # traite les trames complètes reçues ; False si la connexion doit être fermée
+        try:
+            for octets in decodeur.trames():
+                if not self.recevoir(octets):
+                    return False
+        except trame.TrameTropGrande as e:
+            self.erreur(e)
+            return False
+
+        return True
+
+    def recevoir(self, octets: bytes | memoryview) -> bool:
+        # traite un paquet ; False si la connexion doit être fermée
+        salon = self.salon
 
-        salon = None
-        flux_id = None
+        if octets[:4] == b"flux":
+            flux_id = bytes(octets[4:]).decode("utf-8")
+            with _lock_registres:
+                _clients[self.client].flux_id = flux_id
+                _flux.setdefault(flux_id, set()).add(self.client)
+            return True
 
         try:
-            self.envoyer(_paquet_handshake())
+            paquet = Paquet.deserialiser(octets)
+        except MsgpackDecodeError:
+            self.erreur("paquet mal formé, erreur msgpack")
+            return False
+        except ValueError as e:
+            self.erreur(e)
+            return False
 
-            while True:
-                r, w, _ = select.select([self.request], [self.request], [])
+        # print(f"({self.adresse}) reçu paquet: {paquet.x}")
 
-                if w:  # ecrire
-                    if flux_id:
-                        capture = next(
-                            (c for c in _file_captures if c[1] == flux_id), None
+        try:
+            if paquet.type() in (
+                PaquetClientType.PRET.value,
+                PaquetClientType.DEPLACER.value,
+                PaquetClientType.ANNULER.value,
+            ):
+                if not salon or self.client not in salon.clients:
+                    self.erreur("Le client n'a pas été trouvé dans le bon salon !")
+                    return False
+
+            if paquet.type() in (
+                PaquetClientType.DEPLACER.value,
+                PaquetClientType.ANNULER.value,
+            ):
+                trait = salon.partie.trait
+                if not trait or salon.couleur(self.client) != trait:
+                    self.erreur(f"[{salon.code}] Ce n'est pas votre tour !")
+                    return True
+
+            match paquet.type():
+                case PaquetClientType.HANDSHAKE.value:
+                    if _clients.get(self.client).pseudo:
+                        self.erreur("La connexion a déjà été établie !")
+                    else:
+                        pseudo = paquet.x[1]
+                        taille_damier = paquet.x[2]
+                        if taille_damier is not None and (
+                            type(taille_damier) is not int
+                            or not (TAILLE_MIN <= taille_damier <= TAILLE_MAX)
+                        ):
+                            self.erreur("taille de damier invalide")
+                            return False
+                        taille_damier = (
+                            (taille_damier,) * 2 if taille_damier else (8, 8)
                         )
-                        if capture:
-                            _file_captures.remove(capture)
-                            octets = capture[0]
-                            octets = octets + b"FLUX_EOF"
 
-                            try:
-                                self.request.sendall(octets)
-                            except ConnectionError:
-                                break
+                        if not repartition.pseudo_valide(pseudo):
+                            self.erreur("pseudonyme invalide")
+                            return False
+
+                        with _lock_registres:
+                            if pseudo in _pseudos:
+                                self.erreur("pseudonyme déjà pris")
+                                return False
+
+                            _pseudos[pseudo] = self.client
+                            _clients[self.client].pseudo = pseudo
+                        _clients[self.client].taille_damier = taille_damier
+
+                        print(f"({self.adresse}) connecté en tant que '{pseudo}'")
+                case PaquetClientType.SALON.value:
+                    code = paquet.x[1]
+                    contre_ia = (
+                        len(paquet.x) > 2
+                        and paquet.x[2] is True
+                        and configuration.ia["actif"]
+                    )
+
+                    if code and (
+                        not isinstance(code, str) or not (4 <= len(code) <= 32)
+                    ):
+                        self.erreur("code du salon invalide")
+                        return False
+
+                    with _lock_registres:
+                        if self.client in _salons_clients:
+                            self.erreur("déjà dans un salon")
+                            return False
+
+                        nouveau = not code or code not in _salons
+                        if nouveau:
+                            if not code and not _codes:
+                                self.erreur("aucun code de salon libre")
+                                return False
+
+                            salon = Salon(
+                                code,
+                                _clients[self.client].taille_damier,
+                                contre_ia,
+                            )
+                            _salons[salon.code] = salon
+                        else:
+                            salon = _salons[code]
+                        self.salon = salon
 
-                    file = _clients[self.request].file_paquets
-                    if file:
-                        octets = file.pop(0)
-                        self.request.sendall(octets)
-                        continue
+                        if salon.complet:
+                            self.erreur("salon déjà rempli")
+                            return False
 
-                if not r:  # lire
-                    continue
+                        salon.clients.append(self.client)
+                        _salons_clients[self.client] = salon
 
-                parties = []
-                try:
-                    octets = self.request.recv(4)
-                except ConnectionError:
-                    self.erreur("la connexion a été fermée")
-                    break
+                    if nouveau:
+                        _envoyer_creer_salon(salon)
+                    _envoyer_ajouter_joueur(salon, _clients[self.client].pseudo)
 
-                if not octets:
-                    if _clients[self.request] != DonneesClient():
-                        self.erreur("la connexion a été fermée")
-                    break
+                    if len(salon.clients) - 1 == 0:
+                        self.envoyer(_paquet_tour())
 
-                if len(octets) < 4:
-                    self.erreur("paquet mal formé, header taille invalide")
-                    break
+                    self.envoyer(_paquet_salon(salon.code))
+                case PaquetClientType.PRET.value:
+                    if salon.partie.debut and not salon.partie.fin:
+                        self.erreur(f"[{salon.code}] La partie est déjà commencée !")
+                    else:
+                        _clients[self.client].etat_pret = True
+                        print(
+                            f"[{salon.code}] ({self.adresse}) "
+                            f"{_clients[self.client].pseudo} : prêt"
+                        )
 
-                taille_paquet = int.from_bytes(
-                    octets[:4], byteorder="little", signed=False
-                )
+                        if salon.complet:
+                            tous_prets = all(
+                                _clients[c].etat_pret for c in salon.clients
+                            )
 
-                while self.request:
-                    total = sum([len(x) for x in parties])
-                    if total >= taille_paquet:
-                        break
+                            if tous_prets:
+                                salon.affecter_sockets()
+                                noir, blanc = salon.sock_noir, salon.sock_blanc
+
+                                _envoyer(noir, _paquet_couleur(Pion.NOIR))
+                                if blanc:
+                                    _envoyer(blanc, _paquet_couleur(Pion.BLANC))
 
-                    parties.append(self.request.recv(taille_paquet - total))
+                                salon.partie.demarrer(
+                                    _clients[noir].pseudo,
+                                    _clients[blanc].pseudo if blanc else "Ordinateur",
+                                )
+                                _diffuser(
+                                    salon,
+                                    _paquet_lancement(salon.partie.damier),
+                                )
+                                print(f"[{salon.code}] Partie lancée")
+                case PaquetClientType.DEPLACER.value:
+                    if salon.partie.fin:
+                        self.erreur(f"[{salon.code}] La partie est déjà finie !")
+                    elif salon.partie.ia_en_cours:
+                        self.erreur(
+                            f"[{salon.code}] L'ordinateur est en train de jouer !"
+                        )
+                    else:
+                        source, cible = tuple(paquet.x[1]), tuple(paquet.x[2])
+                        coups = salon.partie.coups().get((source, cible))
 
-                octets = b"".join(parties)
+                        if coups:
+                            pion_source = salon.partie.damier.obtenir_pion(*source)
+                            assert pion_source
 
-                if octets[:4] == b"flux":
-                    flux_id = octets[4:].decode("utf-8")
-                    continue
+                            sauts = salon.partie.deplacer(source, cible)
+                            _diffuser(salon, _paquet_deplacements([source, cible]))
 
-                try:
-                    paquet = Paquet.deserialiser(octets)
-                except MsgpackDecodeError:
-                    self.erreur("paquet mal formé, erreur msgpack")
-                    break
-                except ValueError as e:
-                    self.erreur(e)
-                    break
+                            stat = salon.statistiques(self.client)
+                            pion_cible = salon.partie.damier.obtenir_pion(*cible)
+                            assert stat and pion_cible
 
-                # print(f"({self.client_address[0]}) reçu paquet: {paquet.x}")
+                            stat.sauter(len(sauts))
+                            if not pion_source.est_dame() and pion_cible.est_dame():
+                                stat.dame()
 
-                try:
-                    if paquet.type() in (
-                        PaquetClientType.PRET.value,
-                        PaquetClientType.DEPLACER.value,
-                        PaquetClientType.ANNULER.value,
-                    ):
-                        if not salon or self.request not in salon.clients:
+                            if not _verifier_fin(salon):
+                                # redonner au joueur encore un tour s'il peut sauter par dessus des pions adverses
+                                encore = salon.partie.saut_en_cours
+
+                                adversaire = next(
+                                    (c for c in salon.clients if c != self.client),
+                                    None,
+                                )
+
+                                if encore:
+                                    self.envoyer(_paquet_tour(cible))
+                                elif salon.ia:
+                                    _lancer_ia(salon)
+                                elif not adversaire:
+                                    self.envoyer(_paquet_tour())
+                                else:
+                                    _envoyer(adversaire, _paquet_tour())
+                        else:
                             self.erreur(
-                                "Le client n'a pas été trouvé dans le bon salon !"
+                                f"[{salon.code}] déplacement illégal : {source} -> {cible}"
                             )
-                            break
-
-                    match paquet.type():
-                        case PaquetClientType.HANDSHAKE.value:
-                            if _clients.get(self.request).pseudo:
-                                self.erreur("La connexion a déjà été établie !")
-                            else:
-                                pseudo = paquet.x[1]
-                                taille_damier = paquet.x[2]
-                                assert taille_damier is None or isinstance(
-                                    taille_damier, int
-                                )
-                                taille_damier = (
-                                    (taille_damier,) * 2 if taille_damier else (8, 8)
-                                )
+                case PaquetClientType.ANNULER.value:
+                    if salon.partie.fin:
+                        self.erreur(f"[{salon.code}] La partie est déjà finie !")
+                    elif salon.partie.ia_en_cours:
+                        self.erreur(
+                            f"[{salon.code}] L'ordinateur est en train de jouer !"
+                        )
+                    else:
+                        salon.partie.terminer_tour()
+                        adversaire = next(
+                            (c for c in salon.clients if c != self.client),
+                            None,
+                        )
 
-                                if not isinstance(pseudo, str) or not (
-                                    3 <= len(pseudo) <= 24
-                                ):
-                                    self.erreur("pseudonyme invalide")
-                                    break
+                        if adversaire:
+                            _envoyer(adversaire, _paquet_tour())
+                        elif salon.ia:
+                            _lancer_ia(salon)
+                        else:
+                            self.erreur(f"[{salon.code}] aucun adversaire trouvé !")
+                case PaquetClientType.TCHAT.value:
+                    message = paquet.x[1]
+                    pseudo = _clients[self.client].pseudo
+
+                    assert isinstance(message, str)
+                    message = message.strip()
+
+                    if not (1 <= len(message) <= 300):
+                        self.erreur(f"[{salon.code}] message de tchat invalide !")
+
+                    _diffuser(salon, _paquet_tchat(pseudo, message))
+                case PaquetClientType.CAPTURE.value:
+                    if configuration.php["actif"]:
+                        # transmise aux connexions de flux déjà abonnées,
+                        # perdue s'il n'y en a aucune
+                        image = paquet.x[1]
+                        flux_id = f"{salon.code}/{_clients[self.client].pseudo}"
+                        with _lock_registres:
+                            abonnes = [
+                                _clients[c]
+                                for c in _flux.get(flux_id, ())
+                                if c in _clients
+                            ]
+                        if abonnes:
+                            octets = trame.encoder(image)
+                            for donnees in abonnes:
+                                donnees.ajouter(octets)
+                case _:
+                    self.erreur(f"paquet de type inconnu ({paquet.type()})")
+                    return False
+        except (IndexError, KeyError):
+            self.erreur(f"paquet mal formé ou inattendu ({paquet})")
+            print(traceback.format_exc())
+            return False
 
-                                if pseudo in [d.pseudo for d in _clients.values()]:
-                                    self.erreur("pseudonyme déjà pris")
-                                    break
+        return True
 
-                                _clients[self.request].pseudo = pseudo
-                                _clients[self.request].taille_damier = taille_damier
+    def fermer(self):
+        with _lock_registres:
+            donnees = _clients.pop(self.client, None)
+            if not donnees:
+                return  # serveur arrêté entre temps
+
+            if donnees.flux_id:
+                abonnes = _flux[donnees.flux_id]
+                abonnes.discard(self.client)
+                if not abonnes:
+                    del _flux[donnees.flux_id]
+
+            if donnees.pseudo:
+                del _pseudos[donnees.pseudo]
+
+            salon = _salons_clients.pop(self.client, None)
+            if salon:
+                salon.clients.remove(self.client)
+                for client in salon.clients:
+                    _clients[client].etat_pret = False
+
+                if not salon.clients:
+                    del _salons[salon.code]
+                    _codes.rendre(salon.code)
+
+        if salon:
+            _envoyer_enlever_joueur(salon, donnees.pseudo)
+            salon.partie.arreter()
+
+            if salon.clients:
+                _diffuser(salon, _paquet_attente())
+            else:
+                _envoyer_supprimer_salon(salon)
 
-                                print(
-                                    f"({self.client_address[0]}) connecté en tant que '{pseudo}'"
-                                )
-                        case PaquetClientType.SALON.value:
-                            code = paquet.x[1]
-
-                            if code and (
-                                not isinstance(code, str) or not (4 <= len(code) <= 32)
-                            ):
-                                self.erreur("code du salon invalide")
-                                break
-
-                            if not code or not (
-                                salon := next(
-                                    (s for s in _salons if s.code == code), None
-                                )
-                            ):
-                                salon = Salon(
-                                    code, _clients[self.request].taille_damier
-                                )
-                                _salons.append(salon)
-                                _envoyer_creer_salon(salon)
 
-                            if len(salon.clients) >= 2:
-                                self.erreur("salon déjà rempli")
-                                break
+class Gestionnaire(socketserver.BaseRequestHandler):
+    # mode "threads" : un thread par connexion
+    def setup(self):
+        # un octet écrit dans la paire de sockets réveille le select() de handle()
+        self.reveil_lecture, self.reveil_ecriture = socket.socketpair()
+        self.reveil_ecriture.setblocking(False)
+        self.decodeur = trame.Decodeur()
+        self.session = Session(self.request, self.client_address[0], self.reveiller)
 
-                            salon.clients.append(self.request)
-                            _envoyer_ajouter_joueur(
-                                salon, _clients[self.request].pseudo
-                            )
+    def reveiller(self):
+        try:
+            self.reveil_ecriture.send(b"\0")
+        except (BlockingIOError, OSError):
+            pass  # déjà réveillé, ou connexion fermée
 
-                            if len(salon.clients) - 1 == 0:
-                                self.envoyer(_paquet_tour())
+    def handle(self):
+        try:
+            self.session.ouvrir()
 
-                            self.envoyer(_paquet_salon(salon.code))
-                        case PaquetClientType.PRET.value:
-                            if salon.partie.debut and not salon.partie.fin:
-                                self.erreur(
-                                    f"[{salon.code}] La partie est déjà commencée !"
-                                )
-                            else:
-                                _clients[self.request].etat_pret = True
-                                print(
-                                    f"[{salon.code}] ({self.client_address[0]}) {pseudo} : prêt"
-                                )
+            while True:
+                r, _, _ = select.select([self.request, self.reveil_lecture], [], [])
 
-                                if len(salon.clients) == 2:
-                                    tous_prets = all(
-                                        _clients[c].etat_pret for c in salon.clients
-                                    )
-
-                                    if tous_prets:
-                                        salon.affecter_sockets()
-                                        noir, blanc = salon.sock_noir, salon.sock_blanc
-
-                                        _envoyer(noir, _paquet_couleur(Pion.NOIR))
-                                        _envoyer(blanc, _paquet_couleur(Pion.BLANC))
-
-                                        salon.partie.demarrer(
-                                            _clients[noir].pseudo,
-                                            _clients[blanc].pseudo,
-                                        )
-                                        _diffuser(
-                                            salon,
-                                            _paquet_lancement(salon.partie.damier),
-                                        )
-                                        print(f"[{salon.code}] Partie lancée")
-                        case PaquetClientType.DEPLACER.value:
-                            if salon.partie.fin:
-                                self.erreur(
-                                    f"[{salon.code}] La partie est déjà finie !"
-                                )
-                            else:
-                                source, cible = tuple(paquet.x[1]), tuple(paquet.x[2])
-
-                                if cible in salon.partie.damier.trouver_cases_possibles(
-                                    *source
-                                ):
-                                    pion_source = salon.partie.damier.obtenir_pion(
-                                        *source
-                                    )
-                                    assert pion_source
-
-                                    sauts = salon.partie.damier.deplacer_pion(
-                                        source, cible
-                                    )
-                                    _diffuser(
-                                        salon, _paquet_deplacements([source, cible])
-                                    )
-
-                                    stat = salon.statistiques(self.request)
-                                    pion_cible = salon.partie.damier.obtenir_pion(
-                                        *cible
-                                    )
-                                    assert stat and pion_cible
-
-                                    stat.sauter(len(sauts))
-                                    if (
-                                        not pion_source.est_dame()
-                                        and pion_cible.est_dame()
-                                    ):
-                                        stat.dame()
-
-                                    if gagnant := salon.partie.damier.gagnant():
-                                        salon.partie.arreter()
-                                        _diffuser(salon, _paquet_conclusion(gagnant))
-                                        print(
-                                            f"[{salon.code}] Partie terminée : {gagnant}"
-                                        )
-                                    elif salon.partie.damier.est_bloque():
-                                        salon.partie.arreter()
-                                        _diffuser(salon, _paquet_conclusion(None))
-                                        print(
-                                            f"[{salon.code}] Partie terminée : aucun gagnant"
-                                        )
-                                    else:
-                                        # redonner au joueur encore un tour s'il peut sauter par dessus des pions adverses
-                                        encore = False
-
-                                        if sauts:
-                                            for c in salon.partie.damier.trouver_cases_possibles(
-                                                *cible
-                                            ):
-                                                if encore := bool(
-                                                    salon.partie.damier.deplacer_pion(
-                                                        cible, c, False
-                                                    )
-                                                ):
-                                                    break
-
-                                        adversaire = next(
-                                            (
-                                                c
-                                                for c in salon.clients
-                                                if c != self.request
-                                            ),
-                                            None,
-                                        )
-
-                                        if encore:
-                                            self.envoyer(_paquet_tour(cible))
-                                        elif not adversaire:
-                                            self.envoyer(_paquet_tour())
-                                        else:
-                                            _envoyer(adversaire, _paquet_tour())
-                                else:
-                                    self.erreur(
-                                        f"[{salon.code}] déplacement illégal : {source} -> {cible}"
-                                    )
-                        case PaquetClientType.ANNULER.value:
-                            adversaire = next(
-                                (c for c in salon.clients if c != self.request),
-                                None,
-                            )
+                if self.reveil_lecture in r:  # ecrire tout ce qui attend
+                    self.reveil_lecture.recv(4096)
+                    file = _clients[self.request].file_paquets
+                    try:
+                        while file:
+                            self.request.sendall(file.popleft())
+                    except ConnectionError:
+                        break
 
-                            if adversaire:
-                                _envoyer(adversaire, _paquet_tour())
-                            else:
-                                self.erreur(f"[{salon.code}] aucun adversaire trouvé !")
-                        case PaquetClientType.TCHAT.value:
-                            message = paquet.x[1]
-                            pseudo = _clients[self.request].pseudo
+                if self.request not in r:  # lire
+                    continue
 
-                            assert isinstance(message, str)
-                            message = message.strip()
+                try:
+                    n = self.decodeur.recevoir(self.request)
+                except ConnectionError:
+                    self.session.erreur("la connexion a été fermée")
+                    break
 
-                            if not (1 <= len(message) <= 300):
-                                self.erreur(
-                                    f"[{salon.code}] message de tchat invalide !"
-                                )
+                if not n:
+                    if _clients[self.request] != DonneesClient():
+                        self.session.erreur("la connexion a été fermée")
+                    break
 
-                            _diffuser(salon, _paquet_tchat(pseudo, message))
-                        case PaquetClientType.CAPTURE.value:
-                            if configuration.php["actif"]:
-                                image = paquet.x[1]
-                                _file_captures.append(
-                                    (
-                                        image,
-                                        f"{salon.code}/{_clients[self.request].pseudo}",
-                                    )
-                                )
-                        case _:
-                            self.erreur(f"paquet de type inconnu ({paquet.type()})")
-                            break
-                except (IndexError, KeyError):
-                    self.erreur(f"paquet mal formé ou inattendu ({paquet})")
-                    print(traceback.format_exc())
+                if not self.session.lire(self.decodeur):
                     break
         except Exception:
             print(traceback.format_exc())
             arreter(True)
 
     def finish(self):
-        global _clients
+        try:
+            self.session.fermer()
+        except Exception as e:
+            print(traceback.format_exc())
+            arreter(e)
+        finally:
+            self.reveil_lecture.close()
+            self.reveil_ecriture.close()
+
+
+class ProtocoleClient(asyncio.BufferedProtocol):
+    # mode "asyncio" : toutes les connexions sont servies par une seule boucle,
+    # une connexion inactive ne coûte rien
+    def __init__(self, prelude: bytes | None = None, pseudo: str | None = None):
+        # mode "processus" : octets déjà lus par le répartiteur, qui a envoyé
+        # la poignée de main à la place de la session, et pseudonyme qu'il a
+        # réservé pour la connexion
+        self.prelude, self.pseudo_reserve = prelude, pseudo
+
+    def connection_made(self, transport: asyncio.Transport):
+        self.transport = transport
+        self.decodeur = trame.Decodeur()
+        self.reveil_prevu = False
+        self.session = Session(
+            self, transport.get_extra_info("peername")[0], self.reveiller
+        )
 
+        if self.prelude is None:
+            self.session.ouvrir()
+        else:
+            self.decodeur.ajouter(self.prelude)
+            self.lire()
+
+    def reveiller(self):
+        # un seul vidage est planifié pour tous les paquets ajoutés avant lui
+        if not self.reveil_prevu:
+            self.reveil_prevu = True
+            _boucle.call_soon_threadsafe(self.vider)
+
+    def vider(self):
+        self.reveil_prevu = False
+        donnees = _clients.get(self)
+        if not donnees or self.transport.is_closing():
+            return
+
+        file = donnees.file_paquets
+        while file:
+            self.transport.write(file.popleft())
+
+    def get_buffer(self, sizehint: int) -> memoryview:
+        # la boucle lit directement dans le tampon du décodeur
+        return self.decodeur.espace()
+
+    def buffer_updated(self, nbytes: int):
+        self.decodeur.recu(nbytes)
+        self.lire()
+
+    def lire(self):
         try:
-            if _clients:
-                salon = next((s for s in _salons if self.request in s.clients), None)
+            if not self.session.lire(self.decodeur):
+                # le message d'erreur part avant la fermeture
+                self.vider()
+                self.transport.close()
+        except Exception:
+            print(traceback.format_exc())
+            self.transport.close()
+            _arreter_hors_boucle(True)
 
-                if salon:
-                    _envoyer_enlever_joueur(salon, _clients[self.request].pseudo)
-                    salon.partie.arreter()
-                    salon.clients.remove(self.request)
+    def connection_lost(self, exc: Exception | None):
+        try:
+            self.session.fermer()
+        except Exception as e:
+            print(traceback.format_exc())
+            _arreter_hors_boucle(e)
+        finally:
+            if self.pseudo_reserve is not None:
+                _liberer_pseudo(self.pseudo_reserve)
 
-                _clients.pop(self.request, None)
 
-                for donnees in _clients.values():
-                    donnees.etat_pret = False
+def _arreter_hors_boucle(e):
+    # arreter() attend la fin de la boucle : il ne peut pas y être appelé
+    threading.Thread(target=arreter, args=(e,)).start()
 
-                if salon:
-                    if salon.clients:
-                        _diffuser(salon, _paquet_attente())
-                    else:
-                        _envoyer_supprimer_salon(salon)
-                        _salons.remove(salon)
-        except Exception as e:
-            print(traceback.format_exc())
-            arreter(e)
+
+def _en_fond(fonction, *args):
+    # la base de données et le site PHP sont appelés par un thread à part, dans
+    # l'ordre des demandes : ils ne retiennent ni la boucle ni les connexions
+    if fond := _fond:
+        try:
+            fond.submit(_executer_en_fond, fonction, *args)
+            return
+        except RuntimeError:
+            pass  # serveur arrêté entre temps
+    _executer_en_fond(fonction, *args)
+
+
+def _executer_en_fond(fonction, *args):
+    try:
+        fonction(*args)
+    except ConnectorError as e:
+        print(traceback.format_exc())
+        _arreter_hors_boucle(e)
+    except Exception:
+        print(traceback.format_exc())
+
+
+def _planifier(fonction, *args):
+    # en mode asyncio, l'état des salons n'est modifié que depuis la boucle
+    if _boucle:
+        _boucle.call_soon_threadsafe(fonction, *args)
+    else:
+        fonction(*args)
+
+
+def _verifier_fin(salon: Salon) -> bool:
+    if gagnant := salon.partie.damier.gagnant():
+        salon.partie.arreter()
+        _diffuser(salon, _paquet_conclusion(gagnant))
+        print(f"[{salon.code}] Partie terminée : {gagnant}")
+        return True
+    elif salon.partie.est_bloque():
+        salon.partie.arreter()
+        _diffuser(salon, _paquet_conclusion(None))
+        print(f"[{salon.code}] Partie terminée : aucun gagnant")
+        return True
+
+    return False
+
+
+def _lancer_ia(salon: Salon):
+    salon.partie.ia_en_cours = True
+
+    futur = _processus_ia.submit(
+        ia.analyser,
+        salon.partie.damier.to_bytes(),
+        Pion.BLANC,
+        configuration.ia["budget"],
+        configuration.ia["finales"] or None,
+        configuration.ia["ouvertures"] or None,
+    )
+    cle = salon.partie.damier.cle(Pion.BLANC)
+    futur.add_done_callback(lambda f: _planifier(_jouer_ia, salon, f, cle))
+
+
+def _jouer_ia(salon: Salon, futur, cle: int):
+    # appelé quand le calcul est fini, par le thread de l'exécuteur
+    # ou par la boucle en mode asyncio ; cle est la position analysée
+    partie = salon.partie
+
+    try:
+        resultat = futur.result()
+    except Exception:
+        print(f"[{salon.code}] erreur IA :")
+        print(traceback.format_exc())
+        return
+    finally:
+        partie.ia_en_cours = False
+
+    if partie.fin or not salon.clients or partie.damier.cle(Pion.BLANC) != cle:
+        return
+
+    print(
+        f"[{salon.code}] IA : profondeur {resultat.profondeur}, "
+        f"{resultat.noeuds} nœuds, {resultat.noeuds_par_seconde:.0f} nœuds/s"
+    )
+
+    if coup := resultat.coup:
+        pion_source = partie.damier.obtenir_pion(*coup.source)
+        etapes = list(zip(coup.chemin, coup.chemin[1:]))
+
+        partie.jouer(coup)
+        _diffuser(
+            salon, _paquet_deplacements([case for etape in etapes for case in etape])
+        )
+
+        partie.stat_blanc.sauter(len(coup.sauts()))
+        if (
+            not pion_source.est_dame()
+            and partie.damier.obtenir_pion(*coup.cible).est_dame()
+        ):
+            partie.stat_blanc.dame()
+    else:
+        partie.terminer_tour()
+
+    if not _verifier_fin(salon):
+        _envoyer(salon.sock_noir, _paquet_tour())
 
 
 def _construire_paquet(paquet: Paquet) -> bytes:
-    octets = paquet.serialiser()
-    octets = len(octets).to_bytes(4, byteorder="little", signed=False) + octets
-    return octets
+    return trame.encoder(paquet.serialiser())
 
 
 def _paquet_handshake() -> Paquet:
@@ -601,7 +956,7 @@ def _paquet_attente() -> Paquet:
 
 
 def _paquet_lancement(damier: Damier) -> Paquet:
-    return Paquet([PaquetServeurType.LANCEMENT, damier.matrice])
+    return Paquet([PaquetServeurType.LANCEMENT, damier.to_bytes()])
 
 
 def _paquet_conclusion(gagnant: Pion | None) -> Paquet:
@@ -629,24 +984,24 @@ def _paquet_tchat(pseudo: str, message: str) -> Paquet:
 
 
 def _envoyer(client, paquet: Paquet):
-    octets = _construire_paquet(paquet)
-    _clients[client].file_paquets.append(octets)
+    _clients[client].ajouter(_construire_paquet(paquet))
 
 
 def _diffuser(salon: Salon, paquet: Paquet):
     octets = _construire_paquet(paquet)
     for client in salon.clients:
-        donnees = _clients[client]
-        donnees.file_paquets.append(octets)
+        _clients[client].ajouter(octets)
 
 
 def _envoyer_salon(salon: Salon, donnees: dict):
-    if not _url_php:
-        return
+    if _url_php:
+        _en_fond(_poster_salon, _url_php, donnees)
+
 
+def _poster_salon(url_php: str, donnees: dict):
     try:
         req = urllib.request.Request(
-            _url_php + "salons.php",
+            url_php + "salons.php",
             data=json.dumps(donnees).encode("utf-8"),
             headers={"Content-Type": "application/json"},
             method="POST",
@@ -707,17 +1062,40 @@ def _demarrer_bdd():
 
 
 def demarrer(destination: str, port: int):
+    global _repartiteur
+    global _fond
     global _serv
+    global _boucle
     global _thread
-    global _file_captures
+    global _processus_ia
     global _url_php
 
     def servir():
         _serv.serve_forever()
         arreter()
 
+    def servir_asyncio(boucle: asyncio.AbstractEventLoop):
+        boucle.run_forever()
+        # laisse les transports fermés par arreter() libérer leurs sockets
+        boucle.run_until_complete(asyncio.sleep(0))
+        boucle.close()
+
     with _lock:
+        if configuration.socket["mode"] == "processus" and not _canal:
+            # le processus principal ne fait que répartir les connexions
+            _repartiteur = repartition.Repartiteur(
+                destination,
+                port,
+                configuration.socket["processus"] or os.cpu_count(),
+                _travailleur,
+                _construire_paquet(_paquet_handshake()),
+                _construire_paquet(_paquet_erreur("pseudonyme invalide")),
+                _construire_paquet(_paquet_erreur("pseudonyme déjà pris")),
+            )
+            return
+
         socketserver.ThreadingTCPServer.allow_reuse_address = True
+        _fond = ThreadPoolExecutor(1, "pydames-fond")
 
         if configuration.mysql["actif"]:
             _demarrer_bdd()
@@ -726,21 +1104,43 @@ def demarrer(destination: str, port: int):
             _url_php = (
                 f"http://{configuration.php['adresse']}:{configuration.php['port']}/"
             )
-            _file_captures = []
 
-        _serv = socketserver.ThreadingTCPServer((destination, port), Gestionnaire)
+        if configuration.ia["actif"]:
+            # les processus sont créés avant de lancer les threads du serveur
+            _processus_ia = ProcessPoolExecutor(configuration.ia["processus"])
+            _processus_ia.submit(int).result()
+
+        if _canal:
+            # processus de jeu : les connexions arrivent par _canal
+            _boucle = asyncio.new_event_loop()
+            _boucle.add_reader(_canal, _lire_canal)
+            _thread = threading.Thread(target=servir_asyncio, args=(_boucle,))
+        elif configuration.socket["mode"] == "asyncio":
+            _boucle = asyncio.new_event_loop()
+            _serv = _boucle.run_until_complete(
+                _boucle.create_server(
+                    ProtocoleClient, destination, port, reuse_address=True
+                )
+            )
+            _thread = threading.Thread(target=servir_asyncio, args=(_boucle,))
+        else:
+            _serv = socketserver.ThreadingTCPServer((destination, port), Gestionnaire)
+            _thread = threading.Thread(target=servir)
 
-        _thread = threading.Thread(target=servir)
         _thread.start()
 
 
 def arreter(e: Exception | None = None):
+    global _repartiteur
+    global _fond
     global _base
     global _serv
+    global _boucle
     global _thread
-    global _file_captures
+    global _processus_ia
     global _clients
     global _salons
+    global _codes
 
     with _lock:
         try:
@@ -756,7 +1156,25 @@ def arreter(e: Exception | None = None):
         except Exception:
             pass
 
-        if _serv:
+        if _repartiteur:
+            print("arrêt du serveur...")
+            _repartiteur.arreter()
+            _repartiteur = None
+        elif _boucle:
+            print("arrêt du serveur...")
+
+            def fermer(serveur: asyncio.Server | None):
+                if serveur:
+                    serveur.close()
+                for client in _clients:
+                    client.transport.close()
+                asyncio.get_running_loop().stop()
+
+            _boucle.call_soon_threadsafe(fermer, _serv)
+            if _thread is not threading.current_thread():
+                _thread.join()
+            _boucle = _serv = None
+        elif _serv:
             print("arrêt du serveur...")
             try:
                 _serv.shutdown()
@@ -766,20 +1184,134 @@ def arreter(e: Exception | None = None):
             _serv = None
 
         _thread = None
-        _file_captures = None
+
+        if _fond:
+            # les dernières parties sont enregistrées avant de fermer la base
+            _fond.shutdown()
+            _fond = None
+
+        if _processus_ia:
+            # sans attendre, un processus de jeu qui se termine attendrait ses
+            # processus d'IA avant qu'ils n'aient été prévenus de l'arrêt
+            _processus_ia.shutdown(wait=bool(_canal), cancel_futures=True)
+            _processus_ia = None
 
         if _base:
             _base.arreter()
             _base = None
 
-        _clients.clear()
-        _salons.clear()
+        with _lock_registres:
+            _clients.clear()
+            _flux.clear()
+            _pseudos.clear()
+            _salons.clear()
+            _salons_clients.clear()
+            _codes = ReserveCodes(*_repartition)
 
     if e and configuration.auto_redemarrage:
         print("\nRedémarrage...\n")
         demarrer(configuration.socket["adresse"], configuration.socket["port"])
 
 
+def _finir(code: str):
+    # voir Console.do_finir
+    if code:
+        salon = _salons.get(code)
+        if not salon:
+            print(f"Aucun salon '{code}' !")
+        elif not salon.partie or not salon.partie.debut:
+            print("Il n'y a encore de partie démarrée !")
+        else:
+            print(f"Arrêt du salon : '{salon.code}'")
+            salon.partie.arreter()
+            _diffuser(salon, _paquet_conclusion(None))
+    else:
+        for salon in list(_salons.values()):
+            if salon.partie:
+                print(f"Arrêt du salon : '{salon.code}'")
+                salon.partie.arreter()
+                _diffuser(salon, _paquet_conclusion(None))
+
+
+def _lire_canal():
+    # appelé par la boucle d'un processus de jeu quand le répartiteur a écrit
+    while True:
+        try:
+            message, fds, drapeaux, _ = socket.recv_fds(
+                _canal, repartition.MESSAGE_MAX, 1
+            )
+        except BlockingIOError:
+            return
+
+        # un message vide : le répartiteur s'est arrêté
+        try:
+            if drapeaux & socket.MSG_TRUNC:
+                raise ValueError(f"message tronqué à {len(message)} octets")
+            commande = ormsgpack.unpackb(message) if message else ["arreter"]
+        except (MsgpackDecodeError, ValueError):
+            print("message illisible du répartiteur :")
+            print(traceback.format_exc())
+            for fd in fds:
+                os.close(fd)
+            continue
+
+        match commande[0]:
+            case "connexion":
+                _, prelude, pseudo = commande
+                try:
+                    sock = socket.socket(fileno=fds[0])
+                    _boucle.create_task(
+                        _boucle.connect_accepted_socket(
+                            functools.partial(ProtocoleClient, prelude, pseudo),
+                            sock,
+                        )
+                    )
+                except (OSError, IndexError):
+                    print(traceback.format_exc())
+                    for fd in fds:
+                        os.close(fd)
+                    if pseudo is not None:
+                        _liberer_pseudo(pseudo)
+            case "finir":
+                _finir(commande[1])
+            case "arreter":
+                _boucle.remove_reader(_canal)
+                _arret_demande.set()
+                return
+
+
+def _liberer_pseudo(pseudo: str):
+    # rend au répartiteur le pseudonyme d'une connexion fermée
+    message = ormsgpack.packb(["liberer", pseudo])
+    try:
+        _canal.send(message)
+    except BlockingIOError:
+        _boucle.create_task(_boucle.sock_sendall(_canal, message))
+    except OSError:
+        pass  # répartiteur arrêté
+
+
+def _travailleur(canal: socket.socket, indice: int, nombre: int):
+    # point d'entrée d'un processus de jeu du mode "processus" : sert les
+    # connexions transmises par le répartiteur jusqu'à ce qu'il demande l'arrêt
+    global _canal
+    global _repartition
+    global _codes
+
+    canal.setblocking(False)
+    _canal, _repartition = canal, (indice, nombre)
+    _codes = ReserveCodes(indice, nombre)
+    demarrer(None, None)
+
+    try:
+        _arret_demande.wait()
+    except KeyboardInterrupt:
+        pass  # Ctrl+C dans le terminal du serveur, le répartiteur arrête aussi
+    finally:
+        arreter()
+        canal.close()
+
+
 class Console(cmd.Cmd):
     intro = "Console du serveur pydames\nSaisissez 'help' ou '?' pour afficher les commandes."
     prompt = "pydames> "
@@ -812,18 +1344,11 @@ class Console(cmd.Cmd):
 
     def do_finir(self, arg):
         "Finit une partie ou toutes."
-
-        if arg:
-            salon = next((s for s in _salons if s.code == arg), None)
-            if not salon.partie or not salon.partie.debut:
-                print("Il n'y a encore de partie démarrée !")
-            else:
-                print(f"Arrêt du salon : '{salon.code}'")
-                salon.partie.arreter()
-                _diffuser(salon, _paquet_conclusion(None))
+        if not _repartiteur:
+            _planifier(_finir, arg)
+        elif arg:
+            _repartiteur.envoyer(
+                repartition.processus_du_salon(arg, _repartiteur.nombre), "finir", arg
+            )
         else:
-            for salon in _salons:
-                if salon.partie:
-                    print(f"Arrêt du salon : '{salon.code}'")
-                    salon.partie.arreter()
-                    _diffuser(salon, _paquet_conclusion(None))
+            _repartiteur.diffuser("finir", arg)
@@ -0,0 +1,94 @@
+# découpage du flux TCP en trames, commun au client, au serveur et à la
+# passerelle de flux : 4 octets de taille en petit-boutiste, puis le contenu
+#
+# Les octets reçus sont lus directement dans un tampon réutilisé (recv_into)
+# et les trames complètes en sont extraites sous forme de memoryview, sans copie.
+
+from collections.abc import Iterator
+import socket
+import struct
+
+_TAILLE = struct.Struct("<I")
+
+# les captures d'écran font quelques dizaines de kilo-octets
+TAILLE_MAX = 1 << 24
+
+
+class TrameTropGrande(ValueError):
+    pass
+
+
+def encoder(octets: bytes) -> bytes:
+    return _TAILLE.pack(len(octets)) + octets
+
+
+class Decodeur:
+    def __init__(self, taille_max: int = TAILLE_MAX, taille: int = 1 << 16):
+        self.taille_max = taille_max
+        self.__tampon = bytearray(taille)
+        # octets reçus mais pas encore découpés : tampon[debut:fin]
+        self.__debut = self.__fin = 0
+
+    def __attendus(self) -> int:
+        # taille de la trame en cours, entête compris, si elle est connue
+        if self.__fin - self.__debut < _TAILLE.size:
+            return _TAILLE.size
+        (taille,) = _TAILLE.unpack_from(self.__tampon, self.__debut)
+        return _TAILLE.size + min(taille, self.taille_max)
+
+    def espace(self) -> memoryview:
+        # place libre où écrire les prochains octets reçus, assez grande pour
+        # finir la trame en cours ; les trames déjà renvoyées par trames()
+        # peuvent être écrasées
+        n = self.__fin - self.__debut
+        if not n:
+            self.__debut = self.__fin = 0
+
+        besoin = max(self.__attendus(), n + 1)
+        if self.__debut + besoin > len(self.__tampon):
+            if besoin > len(self.__tampon):
+                tampon = bytearray(max(besoin, 2 * len(self.__tampon)))
+                tampon[:n] = self.__tampon[self.__debut : self.__fin]
+                self.__tampon = tampon
+            else:
+                self.__tampon[:n] = self.__tampon[self.__debut : self.__fin]
+            self.__debut, self.__fin = 0, n
+
+        return memoryview(self.__tampon)[self.__fin :]
+
+    def recu(self, n: int):
+        # n octets ont été écrits au début de espace()
+        self.__fin += n
+
+    def ajouter(self, octets: bytes):
+        # octets reçus autrement que par la socket, par exemple lus par un
+        # autre processus avant de transmettre la connexion
+        vue = memoryview(octets)
+        while vue:
+            espace = self.espace()
+            n = min(len(espace), len(vue))
+            espace[:n] = vue[:n]
+            self.recu(n)
+            vue = vue[n:]
+
+    def recevoir(self, sock: socket.socket) -> int:
+        # 0 quand la connexion est fermée
+        n = sock.recv_into(self.espace())
+        self.recu(n)
+        return n
+
+    def trames(self) -> Iterator[memoryview]:
+        # trames complètes reçues, valables jusqu'au prochain appel à espace()
+        vue = memoryview(self.__tampon)
+        while self.__fin - self.__debut >= _TAILLE.size:
+            (taille,) = _TAILLE.unpack_from(vue, self.__debut)
+            if taille > self.taille_max:
+                raise TrameTropGrande(
+                    f"trame de {taille} octets, au plus {self.taille_max} acceptés"
+                )
+
+            debut = self.__debut + _TAILLE.size
+            if self.__fin < debut + taille:
+                break
+            self.__debut = debut + taille
+            yield vue[debut : debut + taille]
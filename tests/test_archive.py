@@ -0,0 +1,64 @@
+import re
+
+from logic import archive, autojeu, ouvertures, pdn
+from logic.damier import Damier, Pion
+
+# partie aléatoire sur 6x6 où un camp bloqué passe son tour au 12e coup
+TAILLE, GRAINE = 6, 39
+
+
+def _partie() -> archive.Partie:
+    coups, gagnant = autojeu.jouer_partie(TAILLE, "aleatoire", "aleatoire", GRAINE)
+    enregistrement = archive.encoder(TAILLE, TAILLE, coups, gagnant)
+    return archive.decoder(enregistrement[4:])
+
+
+def test_passe_archivee():
+    partie = _partie()
+    assert archive.PASSE in partie.coups
+
+    damier = Damier(TAILLE, TAILLE)
+    damier.installer()
+    trait = Pion.NOIR
+    for chemin in partie.coups:
+        if chemin == archive.PASSE:
+            assert not damier.peut_jouer(trait)
+        else:
+            assert damier.obtenir_pion(*chemin[0]).couleur() == trait
+            for source, cible in zip(chemin, chemin[1:]):
+                damier.deplacer_pion(source, cible)
+        trait = Pion.BLANC if trait == Pion.NOIR else Pion.NOIR
+
+
+def test_livre_apres_passe():
+    partie = _partie()
+    positions = list(ouvertures._positions([partie], TAILLE, TAILLE, 100))
+    joues = [c for c in partie.coups if c != archive.PASSE]
+    assert len(positions) == len(joues)
+
+    damier = Damier(TAILLE, TAILLE)
+    damier.installer()
+    for (cle, _, _, _), chemin in zip(positions, joues):
+        assert cle == damier.cle(damier.obtenir_pion(*chemin[0]).couleur())
+        for source, cible in zip(chemin, chemin[1:]):
+            damier.deplacer_pion(source, cible)
+
+
+def test_pdn_apres_passe():
+    partie = _partie()
+    texte = pdn.formater(partie)
+    (lue,) = pdn.lire(texte.splitlines())
+    assert pdn.valider(lue) == partie
+
+    # chaque numéro précède un coup du camp au trait : « n. » pour les noirs,
+    # « n... » pour les blancs quand les noirs viennent de passer
+    plis = [i for i, c in enumerate(partie.coups) if c != archive.PASSE]
+    jetons = [j for l in texte.splitlines() if l[:1] != "[" for j in l.split()]
+    coup = 0
+    for jeton in jetons[:-1]:  # sans le résultat
+        if re.fullmatch(r"\d+\.(\.\.)?", jeton):
+            assert int(jeton.rstrip(".")) == plis[coup] // 2 + 1
+            assert jeton.endswith("...") == bool(plis[coup] % 2)
+        elif re.fullmatch(r"\d+([-x]\d+)+", jeton):
+            coup += 1
+    assert coup == len(plis)
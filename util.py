@@ -12,12 +12,22 @@ auto_redemarrage = true   # redémarre le serveur automatiquement lors d'une err
 [socket]
 adresse = "0.0.0.0"       # affecter à "127.0.0.1" pour servir seulement sur la machine locale
 port = 2332
+mode = "asyncio"          # "asyncio" : une boucle pour toutes les connexions, "threads" : un thread par connexion,
+                          # "processus" : les salons répartis entre plusieurs processus qui ont chacun leur boucle
+processus = 0             # nombre de processus du mode "processus", 0 pour un par cœur
 
 [flux]   # serveur WebSocket qui sert de flux sur le site web
 actif = true
 adresse = "127.0.0.1"
 port = 2333
 
+[ia]     # adversaire ordinateur
+actif = true
+processus = 2             # nombre de processus qui calculent les coups de l'ordinateur
+budget = 1.0              # temps de réflexion par coup, en secondes
+finales = "finales"       # dossier des tables de finales (python -m logic.finales), "" pour ne pas en utiliser
+ouvertures = ""           # livre d'ouvertures (python -m logic.ouvertures), "" pour ne pas en utiliser
+
 [mysql]  # se connecter à une base de données MySQL
 actif = true
 hote = "localhost"        # adresse IP ou nom de domaine du serveur MySQL
@@ -50,6 +60,10 @@ class ConfigurationServeur:
         assert isinstance(socket, dict)
         assert isinstance(socket.get("adresse"), str)
         assert isinstance(socket.get("port"), int)
+        socket.setdefault("mode", "asyncio")
+        assert socket["mode"] in ("asyncio", "threads", "processus")
+        socket.setdefault("processus", 0)
+        assert isinstance(socket["processus"], int) and socket["processus"] >= 0
 
         flux = conf.get("flux")
         assert isinstance(flux, dict)
@@ -57,6 +71,16 @@ class ConfigurationServeur:
         assert isinstance(flux.get("adresse"), str)
         assert isinstance(flux.get("port"), int)
 
+        ia = conf.get("ia", {"actif": True, "processus": 2, "budget": 1.0})
+        assert isinstance(ia, dict)
+        assert isinstance(ia.get("actif"), bool)
+        assert isinstance(ia.get("processus"), int) and ia["processus"] > 0
+        assert isinstance(ia.get("budget"), (float, int)) and ia["budget"] > 0
+        ia.setdefault("finales", "")
+        assert isinstance(ia["finales"], str)
+        ia.setdefault("ouvertures", "")
+        assert isinstance(ia["ouvertures"], str)
+
         mysql = conf.get("mysql")
         assert isinstance(mysql, dict)
         assert isinstance(mysql.get("actif"), bool)
@@ -82,6 +106,7 @@ class ConfigurationServeur:
 
         self.__socket = socket
         self.__flux = flux
+        self.__ia = ia
         self.__mysql = mysql
         self.__php = php
 
@@ -97,6 +122,10 @@ class ConfigurationServeur:
     def flux(self) -> dict:
         return self.__flux
 
+    @property
+    def ia(self) -> dict:
+        return self.__ia
+
     @property
     def mysql(self) -> dict:
         return self.__mysql
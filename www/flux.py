@@ -4,6 +4,8 @@ import socket
 import websockets
 from websockets.sync.server import serve
 
+from mp import trame
+
 _serveur = None
 _thread = None
 _port_pydames = None
@@ -17,15 +19,20 @@ class Passerelle:
         self.sock.connect((destination, port))
 
     def main(self, flux_id):
-        message = b"flux" + flux_id.encode("utf-8")
-        message = len(message).to_bytes(4, byteorder="little", signed=False) + message
-        self.sock.sendall(message)
+        self.sock.sendall(trame.encoder(b"flux" + flux_id.encode("utf-8")))
 
+        # une capture par trame, transmise au site suivie de son marqueur ;
+        # la première trame est le paquet HANDSHAKE du serveur
+        decodeur = trame.Decodeur()
+        handshake = True
         while self.running:
-            data = self.sock.recv(4096)
-            if not data:
+            if not decodeur.recevoir(self.sock):
                 break
-            self.ws.send(data)
+            for capture in decodeur.trames():
+                if handshake:
+                    handshake = False
+                    continue
+                self.ws.send(b"".join((capture, b"FLUX_EOF")))
 
     def close(self):
         self.sock.close()